@@ -1,19 +1,46 @@
 # app/api/auth.py
-from fastapi import APIRouter, HTTPException, status, Depends
+import math
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status, Depends
 from fastapi.security import HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from datetime import timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from core.auth import (
     create_access_token, 
+    verify_optional_token,
     verify_token,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
-from domain.user_service import UserService
-from infrastructure.db import get_db
+from core.login_admission import LoginRateLimitedError, client_ip, login_admission
+from core.password_hasher import PasswordHasherBusyError
+from domain.loan_service import AsyncLoanService
+from domain.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from domain.user import User
+from domain.user_service import AsyncUserService
+from infrastructure.db import get_async_db
+from infrastructure.replicas import get_async_read_db
+from core.serialization import FastJSONResponse
+from app.api.book.schemas import LoanPageOut, loan_page_to_dict
 
 router = APIRouter()
 
+def _busy_error() -> HTTPException:
+    """パスワード処理が混み合っているときのレスポンス"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="混み合っています。しばらくしてから再度お試しください",
+        headers={"Retry-After": "1"},
+    )
+
+def _rate_limited_error(e: LoginRateLimitedError) -> HTTPException:
+    """試行回数が多すぎるときのレスポンス"""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, math.ceil(min(e.retry_after, 3600))))},
+    )
+
 class LoginRequest(BaseModel):
     email: str
     password: str
@@ -33,13 +60,19 @@ class UserResponse(BaseModel):
     name: str
 
 @router.post("/register", response_model=LoginResponse)
-async def register(register_data: RegisterRequest, db: Session = Depends(get_db)):
+async def register(register_data: RegisterRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
     """ユーザー登録"""
-    user_service = UserService(db)
+    # ハッシュ計算の前に試行回数を確認する
+    try:
+        await login_admission.admit_register(client_ip(request))
+    except LoginRateLimitedError as e:
+        raise _rate_limited_error(e)
+
+    user_service = AsyncUserService(db)
     
     try:
         # ユーザーを作成
-        new_user = user_service.create_user(
+        new_user = await user_service.create_user(
             email=register_data.email,
             name=register_data.name,
             password=register_data.password
@@ -60,6 +93,8 @@ async def register(register_data: RegisterRequest, db: Session = Depends(get_db)
             }
         }
         
+    except PasswordHasherBusyError:
+        raise _busy_error()
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -72,10 +107,19 @@ async def register(register_data: RegisterRequest, db: Session = Depends(get_db)
         )
 
 @router.post("/login", response_model=LoginResponse)
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
     """ユーザーログイン"""
-    user_service = UserService(db)
-    user = user_service.authenticate_user(login_data.email, login_data.password)
+    # ハッシュ計算の前に、IPごと・アカウントごとの試行回数を確認する
+    try:
+        await login_admission.admit_login(client_ip(request), login_data.email)
+    except LoginRateLimitedError as e:
+        raise _rate_limited_error(e)
+
+    user_service = AsyncUserService(db)
+    try:
+        user = await user_service.authenticate_user(login_data.email, login_data.password)
+    except PasswordHasherBusyError:
+        raise _busy_error()
     
     if not user:
         raise HTTPException(
@@ -98,23 +142,57 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
         }
     }
 
-@router.get("/me", response_model=UserResponse)
-async def get_current_user(current_email: str = Depends(verify_token), db: Session = Depends(get_db)):
-    """現在のユーザー情報を取得"""
-    user_service = UserService(db)
-    user = user_service.get_user_by_email(current_email)
-    
+async def get_current_user(current_email: str = Depends(verify_token),
+                           db: AsyncSession = Depends(get_async_read_db)) -> User:
+    """トークンのユーザー（FastAPI依存注入用。トークンの検証もユーザーもキャッシュ優先）"""
+    user = await AsyncUserService(db).get_user_for_auth(current_email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="ユーザーが見つかりません"
         )
-    
+    return user
+
+async def get_optional_current_user(current_email: Optional[str] = Depends(verify_optional_token),
+                                    db: AsyncSession = Depends(get_async_read_db)) -> Optional[User]:
+    """トークンがあればそのユーザー（ログインしていなくても使えるエンドポイント用）"""
+    if current_email is None:
+        return None
+    return await get_current_user(current_email, db)
+
+async def get_optional_current_user_primary(current_email: Optional[str] = Depends(verify_optional_token),
+                                            db: AsyncSession = Depends(get_async_db)) -> Optional[User]:
+    """get_optional_current_user のプライマリ版（書き込みのエンドポイント用）
+
+    エンドポイントの get_async_db と同じセッションを使う（1リクエストで接続を2本使わない）。
+    登録直後でまだレプリカに無いユーザーも見つかる。
+    """
+    if current_email is None:
+        return None
+    return await get_current_user(current_email, db)
+
+@router.get("/me", response_model=UserResponse)
+async def read_current_user(user: User = Depends(get_current_user)):
+    """現在のユーザー情報を取得"""
     return {
         "email": user.email,
         "name": user.name
     }
 
+@router.get("/me/loans", response_model=LoanPageOut)
+async def read_current_user_loans(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """現在のユーザーの貸出履歴（新しい順）"""
+    try:
+        page = await AsyncLoanService(db).get_user_loans(user.id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(loan_page_to_dict(page))
+
 @router.post("/logout")
 async def logout():
     """ログアウト（クライアント側でトークンを削除）"""
@@ -1,61 +1,128 @@
 import sys
 import os
+import asyncio
+import io
+import tempfile
+import anyio
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from pydantic import BaseModel
-from infrastructure.db import get_db
-from domain.book_service import BookService
+from core.serialization import FastJSONResponse, dumps
+from infrastructure.db import SessionLocal, get_async_db, async_session_scope
+from infrastructure.replicas import get_async_read_db
+from domain.book_service import AsyncBookService, BookService, BookConflictError
+from domain.loan_service import AsyncLoanService
+from domain.user import User
+from app.api.auth import get_optional_current_user_primary
+from core.http_cache import cache_headers, is_not_modified, make_etag, not_modified_response
 from domain.book import Book
-
-# Pydanticモデル
-class BookCreate(BaseModel):
-    title: str
-    author: str
-    isbn: Optional[str] = None
-    description: Optional[str] = None
-    pages: Optional[int] = None
-    published_year: Optional[int] = None
-
-class BookUpdate(BaseModel):
-    title: Optional[str] = None
-    author: Optional[str] = None
-    isbn: Optional[str] = None
-    description: Optional[str] = None
-    pages: Optional[int] = None
-    published_year: Optional[int] = None
+from domain.book_cache import book_cache
+from domain.book_events import book_events
+from domain.book_stats import FACET_NAMES, book_stats
+from domain.book_export import MEDIA_TYPES
+from domain.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .schemas import (
+    BookBatchOut, BookCreate, BookIdsIn, BookUpdate, BookOut, BookPageOut, LoanBatchIn, LoanBatchOut, LoanPageOut,
+    SearchPageOut, BOOK_FIELDS, DEFAULT_LIST_FIELDS,
+    batch_to_dict, book_to_dict, load_fields, loan_page_to_dict, loan_report_to_dict, page_to_dict, parse_fields,
+    parse_ids, search_page_to_dict,
+)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[dict])
-def get_books(db: Session = Depends(get_db)):
-    book_service = BookService(db)
-    books = book_service.get_all_books()
-    
-    # Bookオブジェクトを辞書に変換
-    books_data = []
-    for book in books:
-        books_data.append({
-            "id": book.id,
-            "title": book.title,
-            "author": book.author,
-            "isbn": book.isbn,
-            "description": book.description,
-            "pages": book.pages,
-            "published_year": book.published_year,
-            "is_available": book.is_available,
-            "created_at": book.created_at.isoformat() if book.created_at else None,
-            "updated_at": book.updated_at.isoformat() if book.updated_at else None,
-        })
-    
-    return books_data
-
-@router.post("/", response_model=dict)
-def create_book(book_data: BookCreate, db: Session = Depends(get_db)):
-    book_service = BookService(db)
-    book = book_service.create_book(
+# 条件付きGET用のETag・最終更新日時
+def _book_version(book: Book) -> tuple:
+    # 同じ秒に貸出と返却があっても区別できるよう、状態の列も含める
+    return (book.id, book.updated_at or book.created_at, book.is_available, book.borrowed_until)
+
+def _book_etag(book: Book) -> str:
+    return make_etag(*_book_version(book))
+
+def _page_etag(page) -> str:
+    # 一覧はページ内の各行の版から作る（追加・削除・更新のどれでも変わる）
+    return make_etag(page.next_cursor, *(part for book in page.items for part in _book_version(book)))
+
+def _batch_etag(batch) -> str:
+    return make_etag(*batch.missing, *(part for book in batch.items for part in _book_version(book)))
+
+# ページング用のクエリパラメータ（limit / cursor / sort / order）
+class PageParams(BaseModel):
+    limit: int
+    cursor: Optional[str]
+    sort: str
+    order: str
+
+def get_page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: str = Query("id", pattern="^(id|title)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+) -> PageParams:
+    return PageParams(limit=limit, cursor=cursor, sort=sort, order=order)
+
+# 出力する列（?fields=title,author のように指定する）
+FIELDS_DESCRIPTION = "出力する列（カンマ区切り、all で全列）"
+
+def _parse_fields(value: Optional[str], default: tuple):
+    try:
+        return parse_fields(value, default)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def get_list_fields(fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)):
+    """一覧の列（省略時は大きい列を含まない最小限の列）"""
+    return _parse_fields(fields, DEFAULT_LIST_FIELDS)
+
+def get_search_fields(fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)):
+    """検索結果の列（省略時は全列）"""
+    return _parse_fields(fields, BOOK_FIELDS)
+
+def get_batch_fields(fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)):
+    """まとめて取得の列（省略時は全列）"""
+    return _parse_fields(fields, BOOK_FIELDS)
+
+async def _get_batch(db: AsyncSession, ids, fields: tuple):
+    try:
+        return await AsyncBookService(db).get_books_by_ids(ids, fields=load_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/", response_model=BookPageOut)
+async def get_books(request: Request, page_params: PageParams = Depends(get_page_params),
+                    fields: tuple = Depends(get_list_fields), db: AsyncSession = Depends(get_async_read_db),
+                    ids: Optional[str] = Query(None, description="指定したIDの本だけをこの順で返す（カンマ区切り）")):
+    if ids is not None:
+        try:
+            book_ids = parse_ids(ids)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        batch = await _get_batch(db, book_ids, fields)
+        etag = _batch_etag(batch)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        return FastJSONResponse({**batch_to_dict(batch, fields), "next_cursor": None}, headers=cache_headers(etag))
+
+    book_service = AsyncBookService(db)
+    try:
+        page = await book_service.get_all_books(**page_params.model_dump(), fields=load_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # 変わっていなければ本体を作らずに304を返す
+    etag = _page_etag(page)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    return FastJSONResponse(page_to_dict(page, fields), headers=cache_headers(etag))
+
+@router.post("/", response_model=BookOut)
+async def create_book(book_data: BookCreate, db: AsyncSession = Depends(get_async_db)):
+    book_service = AsyncBookService(db)
+    book = await book_service.create_book(
         title=book_data.title,
         author=book_data.author,
         isbn=book_data.isbn,
@@ -64,71 +131,276 @@ def create_book(book_data: BookCreate, db: Session = Depends(get_db)):
         published_year=book_data.published_year
     )
     
-    return {
-        "id": book.id,
-        "title": book.title,
-        "author": book.author,
-        "isbn": book.isbn,
-        "description": book.description,
-        "pages": book.pages,
-        "published_year": book.published_year,
-        "is_available": book.is_available,
-        "borrowed_until": book.borrowed_until.isoformat() if book.borrowed_until else None,
-        "created_at": book.created_at.isoformat() if book.created_at else None,
-        "updated_at": book.updated_at.isoformat() if book.updated_at else None,
-    }
+    return FastJSONResponse(book_to_dict(book))
+
+# 本の一括取り込み（CSV / NDJSON）
+@router.post("/bulk", response_model=dict)
+async def bulk_import_books(request: Request, format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """リクエストボディのCSV / NDJSONから本を一括取り込み（ISBNが同じ本は上書き）"""
+    # ボディは一時ファイルに書き出し、メモリに全件載せない
+    spool = tempfile.TemporaryFile()
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+
+    def run_import():
+        # COPYを使うため同期セッション（psycopg2）で実行する
+        db = SessionLocal()
+        try:
+            source = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+            return BookService(db).import_books(source, format)
+        finally:
+            db.close()
+            spool.close()
+
+    try:
+        report = await asyncio.to_thread(run_import)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="UTF-8として読めない行があります")
+    return report.to_dict()
+
+# IDを指定してまとめて取得（URLに載らない数のIDもボディで渡せる）
+@router.post("/batch-get", response_model=BookBatchOut)
+async def batch_get_books(body: BookIdsIn, fields: tuple = Depends(get_batch_fields),
+                          db: AsyncSession = Depends(get_async_read_db)):
+    """指定したIDの本を指定した順で返す（見つからなかったIDは missing）"""
+    batch = await _get_batch(db, body.ids, fields)
+    return FastJSONResponse(batch_to_dict(batch, fields))
+
+# まとめて貸出・返却（カウンターで複数冊を1回の処理で扱う）
+def _loan_response(report):
+    # atomic で取り消した場合は、どの本が原因かを含めて409を返す
+    return FastJSONResponse(loan_report_to_dict(report), status_code=200 if report.committed else 409)
+
+@router.post("/borrow", response_model=LoanBatchOut)
+async def borrow_books(body: LoanBatchIn, db: AsyncSession = Depends(get_async_db),
+                       user: Optional[User] = Depends(get_optional_current_user_primary)):
+    """複数の本をまとめて貸し出し（1冊ごとの結果を results に返す。ログインしていれば貸出履歴に記録）"""
+    try:
+        report = await AsyncBookService(db).borrow_books(body.ids, body.mode, user_id=user.id if user else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _loan_response(report)
+
+@router.post("/return", response_model=LoanBatchOut)
+async def return_books(body: LoanBatchIn, db: AsyncSession = Depends(get_async_db)):
+    """複数の本をまとめて返却（1冊ごとの結果を results に返す）"""
+    try:
+        report = await AsyncBookService(db).return_books(body.ids, body.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _loan_response(report)
+
+# 本の検索（/{book_id}より前に定義）
+@router.get("/search", response_model=SearchPageOut)
+async def search_books(
+    q: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: tuple = Depends(get_search_fields),
+    author: Optional[str] = Query(None, description="著者で絞り込む（/facets の値）"),
+    published_year: Optional[int] = Query(None, description="出版年で絞り込む（/facets の値）"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """タイトル・著者・説明で本を検索（関連度順、ハイライト付き）"""
+    book_service = AsyncBookService(db)
+    try:
+        page = await book_service.search_books(q, limit=limit, cursor=cursor, fields=load_fields(fields),
+                                               author=author, published_year=published_year)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return FastJSONResponse(search_page_to_dict(page, fields))
+
+# 本の統計（総数・貸出可能・貸出中。DBには問い合わせない）
+@router.get("/stats", response_model=dict)
+async def get_book_stats():
+    await book_stats.ensure_fresh()
+    return FastJSONResponse(book_stats.summary())
+
+# ファセット（著者別・出版年別の冊数の多い順。値は /search の author / published_year に使える）
+@router.get("/facets", response_model=dict)
+async def get_book_facets(
+    facet: Optional[str] = Query(None, description=f"返すファセット（{' / '.join(FACET_NAMES)}、省略時は全て）"),
+    limit: int = Query(20, ge=1, le=1000),
+):
+    names = FACET_NAMES if facet is None else tuple(name.strip() for name in facet.split(","))
+    unknown = set(names) - set(FACET_NAMES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"ファセット {', '.join(sorted(unknown))} はありません")
+    await book_stats.ensure_fresh()
+    return FastJSONResponse(book_stats.facets(names, limit))
+
+# キャッシュの統計（ヒット・ミス・追い出し回数）
+@router.get("/cache/stats", response_model=dict)
+async def get_cache_stats():
+    return book_cache.stats()
+
+# 本の一覧をエクスポート（/{book_id}より前に定義）
+@router.get("/export")
+async def export_books(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """全ての本をNDJSON/CSVでストリーミング出力"""
+    async def body():
+        # レスポンスを送り終わるまでセッションを保持する
+        async with async_session_scope() as db:
+            async for chunk in AsyncBookService(db).export_books(format):
+                yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="books.{format}"'},
+    )
+
+# 変更フィード（/{book_id}より前に定義）
+EVENT_HEARTBEAT_SECONDS = 15.0
+
+def _parse_resume(last_event_id: Optional[str], stream: Optional[str], since: Optional[int]):
+    """再開位置（Last-Event-ID の "stream:seq"、または ?stream=&since=）"""
+    if last_event_id:
+        stream, _, seq = last_event_id.partition(":")
+        since = int(seq) if seq.isdigit() else None
+    return stream, since
+
+async def _book_event_stream(stream: Optional[str], since: Optional[int]):
+    """hello → （続きのイベント）→ 新しいイベント の順に (種類, 内容) を返す"""
+    subscription, backlog, gap = book_events.subscribe(stream, since)
+    try:
+        yield "hello", {"stream": book_events.stream_id, "seq": book_events.last_seq}
+        if gap:
+            yield "reset", {"seq": since}
+        for event in backlog:
+            yield "event", event
+        while True:
+            item = await subscription.get(EVENT_HEARTBEAT_SECONDS)
+            if item is None:
+                yield "ping", None
+            elif item is subscription.OVERFLOW:
+                # 受け取りが追いつかなかったので、取り直してもらって切断する
+                yield "reset", {"seq": book_events.last_seq}
+                return
+            else:
+                yield "event", item
+    finally:
+        subscription.close()
+
+def _sse_message(kind: str, payload) -> bytes:
+    if kind == "ping":
+        return b": ping\n\n"
+    if kind == "event":
+        return (f"id: {book_events.stream_id}:{payload.seq}\nevent: {payload.type}\n".encode()
+                + b"data: " + dumps(payload.to_dict()) + b"\n\n")
+    return f"event: {kind}\n".encode() + b"data: " + dumps(payload) + b"\n\n"
+
+@router.get("/events")
+async def book_events_sse(request: Request, stream: Optional[str] = None, since: Optional[int] = Query(None, ge=0)):
+    """本の変更をServer-Sent Eventsで配信（Last-Event-ID または ?stream=&since= で続きから再開）
+
+    フィードはワーカーごとなので、複数ワーカーでは他のワーカーが処理した書き込みのイベントは届かない。
+    overdue は延滞の処理をするリーダーのワーカーでしか流れない。
+    """
+    stream, since = _parse_resume(request.headers.get("last-event-id"), stream, since)
+
+    async def body():
+        async for kind, payload in _book_event_stream(stream, since):
+            yield _sse_message(kind, payload)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/events/ws")
+async def book_events_ws(websocket: WebSocket, stream: Optional[str] = None, since: Optional[int] = None):
+    """本の変更をWebSocketで配信（メッセージは SSE の data と同じJSON。届くイベントは /events と同じ）"""
+    await websocket.accept()
+
+    async def send_events():
+        try:
+            async for kind, payload in _book_event_stream(stream, since):
+                message = payload.to_dict() if kind == "event" else {"type": kind, **(payload or {})}
+                await websocket.send_text(dumps(message).decode())
+            # 受け取りが追いつかず reset を送った場合はこちらから切断する
+            await websocket.close()
+        except WebSocketDisconnect:
+            pass
+        tasks.cancel_scope.cancel()
+
+    async def wait_disconnect():
+        # クライアントからのメッセージは使わない。切断をすぐ検知して購読を解除するために読む
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+        tasks.cancel_scope.cancel()
+
+    async with anyio.create_task_group() as tasks:
+        tasks.start_soon(send_events)
+        tasks.start_soon(wait_disconnect)
+
+# 返却期限を過ぎた本の一覧（期限の古い順。/{book_id}より前に定義）
+@router.get("/overdue", response_model=BookPageOut)
+async def get_overdue_books(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: tuple = Depends(get_list_fields),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    try:
+        page = await AsyncBookService(db).get_overdue_books(limit=limit, cursor=cursor, fields=load_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(page_to_dict(page, fields))
 
 # 貸出中の本一覧を取得（/{book_id}より前に定義）
-@router.get("/borrowed", response_model=List[dict])
-def get_borrowed_books(db: Session = Depends(get_db)):
+@router.get("/borrowed", response_model=BookPageOut)
+async def get_borrowed_books(request: Request, page_params: PageParams = Depends(get_page_params),
+                             fields: tuple = Depends(get_list_fields), db: AsyncSession = Depends(get_async_read_db)):
     """貸出中の本一覧を取得"""
-    book_service = BookService(db)
-    books = book_service.get_borrowed_books()
-    
-    books_data = []
-    for book in books:
-        books_data.append({
-            "id": book.id,
-            "title": book.title,
-            "author": book.author,
-            "isbn": book.isbn,
-            "description": book.description,
-            "pages": book.pages,
-            "published_year": book.published_year,
-            "is_available": book.is_available,
-            "borrowed_until": book.borrowed_until.isoformat() if book.borrowed_until else None,
-            "created_at": book.created_at.isoformat() if book.created_at else None,
-            "updated_at": book.updated_at.isoformat() if book.updated_at else None,
-        })
-    
-    return books_data
-
-@router.get("/{book_id}", response_model=dict)
-def get_book(book_id: int, db: Session = Depends(get_db)):
-    book_service = BookService(db)
-    book = book_service.get_book_by_id(book_id)
+    book_service = AsyncBookService(db)
+    try:
+        page = await book_service.get_borrowed_books(**page_params.model_dump(), fields=load_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    etag = _page_etag(page)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    return FastJSONResponse(page_to_dict(page, fields), headers=cache_headers(etag))
+
+@router.get("/{book_id}", response_model=BookOut)
+async def get_book(book_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    book_service = AsyncBookService(db)
+    book = await book_service.get_book_by_id(book_id)
     
     if not book:
-        from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Book not found")
     
-    return {
-        "id": book.id,
-        "title": book.title,
-        "author": book.author,
-        "isbn": book.isbn,
-        "description": book.description,
-        "pages": book.pages,
-        "published_year": book.published_year,
-        "is_available": book.is_available,
-        "borrowed_until": book.borrowed_until.isoformat() if book.borrowed_until else None,
-        "created_at": book.created_at.isoformat() if book.created_at else None,
-        "updated_at": book.updated_at.isoformat() if book.updated_at else None,
-    }
-
-@router.put("/{book_id}", response_model=dict)
-def update_book(book_id: int, book_data: BookUpdate, db: Session = Depends(get_db)):
-    book_service = BookService(db)
+    # 変わっていなければ本体を作らずに304を返す
+    etag = _book_etag(book)
+    last_modified = book.updated_at or book.created_at
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    
+    return FastJSONResponse(book_to_dict(book), headers=cache_headers(etag, last_modified))
+
+# 本の貸出履歴（新しい順）
+@router.get("/{book_id}/loans", response_model=LoanPageOut)
+async def get_book_loans(
+    book_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    try:
+        page = await AsyncLoanService(db).get_book_loans(book_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(loan_page_to_dict(page))
+
+@router.put("/{book_id}", response_model=BookOut)
+async def update_book(book_id: int, book_data: BookUpdate, db: AsyncSession = Depends(get_async_db)):
+    book_service = AsyncBookService(db)
     
     # 更新データを準備
     update_data = {}
@@ -145,106 +417,50 @@ def update_book(book_id: int, book_data: BookUpdate, db: Session = Depends(get_d
     if book_data.published_year is not None:
         update_data["published_year"] = book_data.published_year
     
-    book = book_service.update_book(book_id, **update_data)
+    book = await book_service.update_book(book_id, **update_data)
     
     if not book:
-        from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Book not found")
     
-    return {
-        "id": book.id,
-        "title": book.title,
-        "author": book.author,
-        "isbn": book.isbn,
-        "description": book.description,
-        "pages": book.pages,
-        "published_year": book.published_year,
-        "is_available": book.is_available,
-        "borrowed_until": book.borrowed_until.isoformat() if book.borrowed_until else None,
-        "created_at": book.created_at.isoformat() if book.created_at else None,
-        "updated_at": book.updated_at.isoformat() if book.updated_at else None,
-    }
+    return FastJSONResponse(book_to_dict(book))
 
 @router.delete("/{book_id}")
-def delete_book(book_id: int, db: Session = Depends(get_db)):
-    book_service = BookService(db)
-    success = book_service.delete_book(book_id)
+async def delete_book(book_id: int, db: AsyncSession = Depends(get_async_db)):
+    book_service = AsyncBookService(db)
+    success = await book_service.delete_book(book_id)
     
     if not success:
-        from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Book not found")
     
     return {"message": "Book deleted successfully"}
 
-@router.get("/search", response_model=List[dict])
-def search_books(q: str, db: Session = Depends(get_db)):
-    book_service = BookService(db)
-    books = book_service.search_books(q)
-    
-    books_data = []
-    for book in books:
-        books_data.append({
-            "id": book.id,
-            "title": book.title,
-            "author": book.author,
-            "isbn": book.isbn,
-            "description": book.description,
-            "pages": book.pages,
-            "published_year": book.published_year,
-            "is_available": book.is_available,
-            "created_at": book.created_at.isoformat() if book.created_at else None,
-            "updated_at": book.updated_at.isoformat() if book.updated_at else None,
-        })
-    
-    return books_data
-
-
 # 本の貸出
-@router.post("/{book_id}/borrow", response_model=dict)
-def borrow_book(book_id: int, db: Session = Depends(get_db)):
-    """本を貸し出し（1週間）"""
-    book_service = BookService(db)
-    book = book_service.borrow_book(book_id)
+@router.post("/{book_id}/borrow", response_model=BookOut)
+async def borrow_book(book_id: int, db: AsyncSession = Depends(get_async_db),
+                      user: Optional[User] = Depends(get_optional_current_user_primary)):
+    """本を貸し出し（1週間。ログインしていれば貸出履歴にユーザーを記録）"""
+    book_service = AsyncBookService(db)
+    try:
+        book = await book_service.borrow_book(book_id, user_id=user.id if user else None)
+    except BookConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     
     if not book:
-        from fastapi import HTTPException
-        raise HTTPException(status_code=404, detail="Book not found or not available")
-    
-    return {
-        "id": book.id,
-        "title": book.title,
-        "author": book.author,
-        "isbn": book.isbn,
-        "description": book.description,
-        "pages": book.pages,
-        "published_year": book.published_year,
-        "is_available": book.is_available,
-        "borrowed_until": book.borrowed_until.isoformat() if book.borrowed_until else None,
-        "created_at": book.created_at.isoformat() if book.created_at else None,
-        "updated_at": book.updated_at.isoformat() if book.updated_at else None,
-    }
+        raise HTTPException(status_code=404, detail="Book not found")
+    
+    return FastJSONResponse(book_to_dict(book))
 
 # 本の返却
-@router.post("/{book_id}/return", response_model=dict)
-def return_book(book_id: int, db: Session = Depends(get_db)):
+@router.post("/{book_id}/return", response_model=BookOut)
+async def return_book(book_id: int, db: AsyncSession = Depends(get_async_db)):
     """本を返却"""
-    book_service = BookService(db)
-    book = book_service.return_book(book_id)
+    book_service = AsyncBookService(db)
+    try:
+        book = await book_service.return_book(book_id)
+    except BookConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     
     if not book:
-        from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Book not found")
     
-    return {
-        "id": book.id,
-        "title": book.title,
-        "author": book.author,
-        "isbn": book.isbn,
-        "description": book.description,
-        "pages": book.pages,
-        "published_year": book.published_year,
-        "is_available": book.is_available,
-        "borrowed_until": book.borrowed_until.isoformat() if book.borrowed_until else None,
-        "created_at": book.created_at.isoformat() if book.created_at else None,
-        "updated_at": book.updated_at.isoformat() if book.updated_at else None,
-    }
+    return FastJSONResponse(book_to_dict(book))
@@ -0,0 +1,198 @@
+# app/api/book/schemas.py
+"""
+本のAPIの入出力モデルと、レスポンス用のシリアライザ
+
+BookOut がレスポンスの形の定義（OpenAPIにもこれが出る）。実際のレスポンスは
+book_to_dict / page_to_dict で属性を直接読んで作り、pydantic の検証は通さない。
+?fields= で列を指定された場合は、その列だけを出力する（読むのもその列だけ）。
+"""
+from datetime import datetime
+from functools import lru_cache
+from operator import attrgetter
+from typing import List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict
+
+from domain.book import Book
+from domain.loan import Loan
+
+
+class BookCreate(BaseModel):
+    title: str
+    author: str
+    isbn: Optional[str] = None
+    description: Optional[str] = None
+    pages: Optional[int] = None
+    published_year: Optional[int] = None
+
+class BookUpdate(BaseModel):
+    title: Optional[str] = None
+    author: Optional[str] = None
+    isbn: Optional[str] = None
+    description: Optional[str] = None
+    pages: Optional[int] = None
+    published_year: Optional[int] = None
+
+class BookOut(BaseModel):
+    """本のレスポンス"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    author: str
+    isbn: Optional[str] = None
+    description: Optional[str] = None
+    pages: Optional[int] = None
+    published_year: Optional[int] = None
+    is_available: bool
+    borrowed_until: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class SearchHitOut(BookOut):
+    """検索結果の1件（関連度とハイライト付き）"""
+    rank: float
+    snippet: Optional[str] = None
+
+class BookPageOut(BaseModel):
+    items: List[BookOut]
+    next_cursor: Optional[str] = None
+    # ?ids= で指定した場合のみ: 見つからなかったID
+    missing: Optional[List[int]] = None
+
+class BookIdsIn(BaseModel):
+    """まとめて取得するID（この順で返す）"""
+    ids: List[int]
+
+class BookBatchOut(BaseModel):
+    items: List[BookOut]
+    missing: List[int]
+
+class LoanBatchIn(BaseModel):
+    """まとめて貸出・返却する本（atomic: 1冊でも失敗したら全て取り消す / best_effort: できた本だけ確定）"""
+    ids: List[int]
+    mode: Literal["atomic", "best_effort"] = "atomic"
+
+class LoanOutcomeOut(BaseModel):
+    id: int
+    status: str
+    book: Optional[BookOut] = None
+
+class LoanBatchOut(BaseModel):
+    mode: str
+    committed: bool
+    results: List[LoanOutcomeOut]
+
+class LoanOut(BaseModel):
+    """貸出履歴の1件"""
+    id: int
+    book_id: int
+    user_id: Optional[int] = None
+    borrowed_at: datetime
+    due_at: datetime
+    returned_at: Optional[datetime] = None
+
+class LoanPageOut(BaseModel):
+    items: List[LoanOut]
+    next_cursor: Optional[str] = None
+
+class SearchPageOut(BaseModel):
+    items: List[SearchHitOut]
+    next_cursor: Optional[str] = None
+
+
+# レスポンスに出す列（BookOut の定義順）
+BOOK_FIELDS = tuple(BookOut.model_fields)
+
+# 一覧で fields を省略したときの列（description などの大きい列は含めない）
+DEFAULT_LIST_FIELDS = ("id", "title", "author", "isbn", "is_available", "borrowed_until")
+
+
+def parse_fields(value: Optional[str], default: Tuple[str, ...] = BOOK_FIELDS) -> Tuple[str, ...]:
+    """
+    ?fields= の値（カンマ区切り、"all" で全列）を出力する列のタプルにする（idは常に含む）
+
+    Raises:
+        ValueError: 存在しない列が指定された場合
+    """
+    if value is None:
+        return default
+    if value.strip() == "all":
+        return BOOK_FIELDS
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = requested - set(BOOK_FIELDS)
+    if unknown:
+        raise ValueError(f"フィールド {', '.join(sorted(unknown))} はありません")
+    requested.add("id")
+    return tuple(name for name in BOOK_FIELDS if name in requested)
+
+
+def parse_ids(value: str) -> List[int]:
+    """
+    ?ids= の値（カンマ区切りの整数）をIDのリストにする
+
+    Raises:
+        ValueError: 整数でない値がある場合
+    """
+    try:
+        return [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise ValueError("ids はカンマ区切りの整数で指定してください")
+
+
+def load_fields(fields: Tuple[str, ...]) -> Optional[Tuple[str, ...]]:
+    """サービスに渡す読み込み列（全列ならNone）"""
+    return None if fields == BOOK_FIELDS else fields
+
+
+@lru_cache(maxsize=128)
+def _fields_getter(fields: Tuple[str, ...]):
+    getter = attrgetter(*fields)
+    if len(fields) == 1:
+        # attrgetter は1列だとタプルを返さない
+        return lambda book: (getter(book),)
+    return getter
+
+
+def book_to_dict(book: Book, fields: Tuple[str, ...] = BOOK_FIELDS) -> dict:
+    """BookをBookOutの形の辞書にする（日時はエンコード時に文字列になる）"""
+    return dict(zip(fields, _fields_getter(fields)(book)))
+
+
+def page_to_dict(page, fields: Tuple[str, ...] = BOOK_FIELDS) -> dict:
+    return {"items": [book_to_dict(book, fields) for book in page.items], "next_cursor": page.next_cursor}
+
+
+def batch_to_dict(batch, fields: Tuple[str, ...] = BOOK_FIELDS) -> dict:
+    return {"items": [book_to_dict(book, fields) for book in batch.items], "missing": batch.missing}
+
+
+def loan_report_to_dict(report) -> dict:
+    return {
+        "mode": report.mode,
+        "committed": report.committed,
+        "results": [
+            {"id": outcome.id, "status": outcome.status,
+             "book": book_to_dict(outcome.book) if outcome.book is not None else None}
+            for outcome in report.results
+        ],
+    }
+
+
+# 貸出履歴の列（LoanOut の定義順）
+LOAN_FIELDS = tuple(LoanOut.model_fields)
+
+
+def loan_page_to_dict(page) -> dict:
+    getter = attrgetter(*LOAN_FIELDS)
+    return {"items": [dict(zip(LOAN_FIELDS, getter(loan))) for loan in page.items], "next_cursor": page.next_cursor}
+
+
+def search_page_to_dict(page, fields: Tuple[str, ...] = BOOK_FIELDS) -> dict:
+    items = []
+    for hit in page.items:
+        item = book_to_dict(hit.book, fields)
+        item["rank"] = hit.rank
+        item["snippet"] = hit.snippet
+        items.append(item)
+    return {"items": items, "next_cursor": page.next_cursor}
@@ -0,0 +1,69 @@
+# app/api/health.py
+"""
+ヘルスチェック（オーケストレーター用）
+
+- /healthz: プロセスが動いているか（DBには問い合わせない）。プールの状態と直近のDBの応答時間、レプリカと
+            延滞の定期処理の状態を返す
+- /readyz:  リクエストを受けられるか。プールが使い切られている、またはDBが応答しない場合は 503
+
+設定（環境変数）:
+- READY_MAX_POOL_SATURATION: プールの使用率がこれ以上なら準備できていないとみなす（既定 1.0 = 使い切り）
+- READY_DB_TIMEOUT:          DBの応答を待つ秒数（既定 1.0）
+"""
+import asyncio
+import os
+import time
+
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from infrastructure.db import PRIMARY_POOL, ping_database, pool_status
+from infrastructure.replicas import replicas
+from domain.overdue_sweeper import overdue_sweeper
+
+router = APIRouter()
+
+READY_MAX_POOL_SATURATION = float(os.getenv("READY_MAX_POOL_SATURATION", "1.0"))
+READY_DB_TIMEOUT = float(os.getenv("READY_DB_TIMEOUT", "1.0"))
+
+# 直近の /readyz でのDBの確認結果（/healthz でも返す）
+_last_check = {"ok": None, "latency_ms": None, "error": None, "checked_at": None}
+
+
+def _pool_report() -> dict:
+    pools = pool_status()
+    return {"primary": PRIMARY_POOL, **pools}
+
+
+@router.get("/healthz", include_in_schema=False)
+async def healthz():
+    return JSONResponse({"status": "ok", "pool": _pool_report(), "db": _last_check, "replicas": replicas.status(),
+                         "overdue_sweeper": overdue_sweeper.status()})
+
+
+@router.get("/readyz", include_in_schema=False)
+async def readyz():
+    pools = _pool_report()
+    saturation = pools[PRIMARY_POOL].get("saturation", 0.0)
+    if saturation >= READY_MAX_POOL_SATURATION:
+        # 空き接続が無いので、DBへの確認はせずに（接続待ちに加わらずに）すぐ返す
+        return JSONResponse(
+            {"status": "unavailable", "reason": "pool_exhausted", "pool": pools, "db": _last_check},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+    try:
+        latency = await ping_database(READY_DB_TIMEOUT)
+        _last_check.update(ok=True, latency_ms=round(latency * 1000, 2), error=None)
+    except asyncio.TimeoutError:
+        _last_check.update(ok=False, latency_ms=None, error=f"timeout ({READY_DB_TIMEOUT}s)")
+    except Exception as e:
+        _last_check.update(ok=False, latency_ms=None, error=type(e).__name__)
+    _last_check["checked_at"] = time.time()
+
+    if not _last_check["ok"]:
+        return JSONResponse(
+            {"status": "unavailable", "reason": "database", "pool": pools, "db": _last_check},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    return JSONResponse({"status": "ok", "pool": pools, "db": _last_check})
@@ -1,4 +1,6 @@
 # app/core/auth.py
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -6,6 +8,7 @@ from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
+from infrastructure.cache import MemoryCache
 from infrastructure.db import get_db
 from sqlalchemy.orm import Session
 
@@ -20,6 +23,13 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 # HTTPBearer認証スキーム
 security = HTTPBearer()
+# ログインしていなくても使えるエンドポイント用（ヘッダーが無ければNone）
+optional_security = HTTPBearer(auto_error=False)
+
+# 検証済みトークンのクレームのキャッシュ（プロセス内。トークンの期限を過ぎたエントリは使わない）
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+token_cache = MemoryCache(max_entries=TOKEN_CACHE_MAX_ENTRIES, default_ttl=TOKEN_CACHE_TTL_SECONDS)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """プレーンパスワードとハッシュ化されたパスワードを検証"""
@@ -29,6 +39,16 @@ def get_password_hash(password: str) -> str:
     """パスワードをハッシュ化"""
     return pwd_context.hash(password)
 
+_dummy_hash: Optional[str] = None
+
+def verify_dummy_password(plain_password: str) -> bool:
+    """存在しないユーザー用の検証（本物と同じ時間をかけて、常にFalseを返す）"""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = pwd_context.hash(os.urandom(16).hex())
+    pwd_context.verify(plain_password, _dummy_hash)
+    return False
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """JWTアクセストークンを作成"""
     to_encode = data.copy()
@@ -41,10 +61,34 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def _token_key(token: str) -> str:
+    # トークン自体はキーにせず、ダイジェストにする（メモリ上にトークンを残さない）
+    return "token:" + hashlib.blake2b(token.encode("utf-8"), digest_size=16).hexdigest()
+
+def decode_token(token: str) -> dict:
+    """
+    JWTトークンを検証してクレームを返す（検証済みのクレームは期限までキャッシュする）
+
+    Raises:
+        JWTError: 署名・期限などが不正な場合
+    """
+    key = _token_key(token)
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
+
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    ttl = TOKEN_CACHE_TTL_SECONDS
+    if "exp" in claims:
+        ttl = min(ttl, claims["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(key, claims, ttl)
+    return claims
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """JWTトークンを検証"""
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(credentials.credentials)
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(
@@ -60,6 +104,12 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def verify_optional_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)) -> Optional[str]:
+    """JWTトークンがあれば検証（無ければNone、不正なら401）"""
+    if credentials is None:
+        return None
+    return verify_token(credentials)
+
 # 簡易的なユーザーデータベース（実際の実装では本物のDBを使用）
 fake_users_db = {
     "admin": {
@@ -0,0 +1,69 @@
+# app/core/http_cache.py
+"""
+条件付きGET（ETag / Last-Modified）の共通処理
+
+行の更新日時などから ETag を作り、クライアントが持っている版と同じなら
+レスポンス本体を作らずに 304 Not Modified を返すために使う。
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+# 毎回サーバーに確認させる（変わっていなければ 304 で本体は送らない）
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts) -> str:
+    """値の並びから強いETagを作る"""
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode("utf-8"), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match は弱い比較（W/ を無視して比べる）
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """クライアントのキャッシュがまだ有効かどうか"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match がある場合は If-Modified-Since を見ない（RFC 9110）
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP-date は秒単位なので切り捨てて比べる
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, last_modified))
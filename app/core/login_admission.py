@@ -0,0 +1,197 @@
+# app/core/login_admission.py
+"""
+ログイン・登録の受け付け制御（bcryptの大量実行からCPUを守る）
+
+パスワードのハッシュ計算の前に、トークンバケットで試行回数を制限する。
+
+- IPごと:        LOGIN_IP_BURST 回まで連続で受け付け、1分あたり LOGIN_IP_PER_MINUTE 回ずつ回復する
+- アカウントごと: LOGIN_ACCOUNT_BURST 回 / 1分あたり LOGIN_ACCOUNT_PER_MINUTE 回（登録には使わない）
+- 超えた場合は LoginRateLimitedError（APIでは 429 と Retry-After）。ハッシュ計算もDBの問い合わせもしない
+
+ハッシュ計算全体の同時実行数の上限は password_hasher（上限を超えると 503）が受け持つ。
+
+バケットの保存先は RATE_LIMIT_BACKEND で切り替える。
+- memory（既定）: プロセス内。ワーカーごとに別々に数える
+- redis:          REDIS_URL のRedis。複数ワーカー・複数台で同じバケットを共有する（extras の redis が必要）
+同じ take() を持つクラスなら、他の保存先にも差し替えられる。
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from infrastructure.cache import import_redis
+
+
+class LoginRateLimitedError(RuntimeError):
+    """試行回数が上限を超えた場合のエラー"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class BucketLimit:
+    """トークンバケットの設定（burst 回まで連続で使え、1秒あたり refill_per_second 回分回復する）"""
+    burst: int
+    refill_per_second: float
+
+    @classmethod
+    def per_minute(cls, burst: int, per_minute: float) -> "BucketLimit":
+        return cls(burst, per_minute / 60.0)
+
+
+class MemoryBucketStore:
+    """プロセス内のトークンバケット（古いバケットはLRUで捨てる）"""
+
+    def __init__(self, max_buckets: int = 100000):
+        self.max_buckets = max_buckets
+        # キー -> (残りのトークン, 最後に更新した時刻)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, limit: BucketLimit) -> float:
+        """
+        トークンを1つ使う
+
+        Returns:
+            0 なら受け付け。正の値なら受け付けず、次のトークンが貯まるまでの秒数
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(limit.burst), now))
+            tokens = min(float(limit.burst), tokens + (now - updated) * limit.refill_per_second)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / limit.refill_per_second if limit.refill_per_second > 0 else math.inf
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def info(self) -> dict:
+        return {"backend": "memory", "buckets": len(self._buckets)}
+
+
+# Redis側でバケットを更新するスクリプト（読み出しと更新を1回の往復で原子的に行う）
+_REDIS_TAKE_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+elseif rate > 0 then
+  wait = (1 - tokens) / rate
+else
+  wait = -1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+if rate > 0 then
+  redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+end
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """Redisに保存するトークンバケット（複数ワーカーで共有）"""
+
+    def __init__(self, url: str, prefix: str = "booklog:ratelimit:"):
+        redis = import_redis("RATE_LIMIT_BACKEND=redis")
+
+        self.url = url
+        self.prefix = prefix
+        self._client = redis.asyncio.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TAKE_SCRIPT)
+
+    async def take(self, key: str, limit: BucketLimit) -> float:
+        wait = float(await self._script(keys=[self.prefix + key],
+                                        args=[limit.burst, limit.refill_per_second, time.time()]))
+        return math.inf if wait < 0 else wait
+
+    def info(self) -> dict:
+        return {"backend": "redis", "url": self.url}
+
+
+def create_bucket_store_from_env():
+    """環境変数からバケットの保存先を作成（RATE_LIMIT_BACKEND=memory|redis）"""
+    if os.getenv("RATE_LIMIT_BACKEND", "memory") == "redis":
+        return RedisBucketStore(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return MemoryBucketStore()
+
+
+class LoginAdmission:
+    """ログイン・登録の試行を、ハッシュ計算の前に受け付けるか決める"""
+
+    def __init__(self, store, ip_limit: BucketLimit, account_limit: BucketLimit):
+        self.store = store
+        self.ip_limit = ip_limit
+        self.account_limit = account_limit
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"ip": 0, "account": 0}
+
+    async def _take(self, scope: str, key: str, limit: BucketLimit) -> None:
+        wait = await self.store.take(f"{scope}:{key}", limit)
+        if wait > 0:
+            self.rejected[scope] += 1
+            raise LoginRateLimitedError("試行回数が多すぎます。しばらくしてから再度お試しください", wait)
+
+    async def admit_login(self, ip: Optional[str], email: str) -> None:
+        """
+        ログインの試行を受け付ける
+
+        Raises:
+            LoginRateLimitedError: IPまたはアカウントの試行回数が上限を超えた場合
+        """
+        # IPを先に見る（1つのIPから多数のアカウントを試す攻撃で、他人のアカウントのバケットを減らさない）
+        await self._take("ip", ip or "unknown", self.ip_limit)
+        await self._take("account", email.strip().lower(), self.account_limit)
+        self.admitted += 1
+
+    async def admit_register(self, ip: Optional[str]) -> None:
+        """
+        登録の試行を受け付ける（IPごとの制限のみ）
+
+        Raises:
+            LoginRateLimitedError: IPの試行回数が上限を超えた場合
+        """
+        await self._take("ip", ip or "unknown", self.ip_limit)
+        self.admitted += 1
+
+    def stats(self) -> dict:
+        return {"admitted": self.admitted, "rejected": dict(self.rejected), **self.store.info()}
+
+
+# X-Forwarded-For を信頼するか（リバースプロキシの後ろで動かす場合のみ true にする）
+TRUST_FORWARDED_FOR = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+
+
+def client_ip(request) -> Optional[str]:
+    """制限に使うクライアントのIP"""
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+# アプリ全体で共有するインスタンス
+login_admission = LoginAdmission(
+    create_bucket_store_from_env(),
+    ip_limit=BucketLimit.per_minute(int(os.getenv("LOGIN_IP_BURST", "20")),
+                                    float(os.getenv("LOGIN_IP_PER_MINUTE", "20"))),
+    account_limit=BucketLimit.per_minute(int(os.getenv("LOGIN_ACCOUNT_BURST", "5")),
+                                         float(os.getenv("LOGIN_ACCOUNT_PER_MINUTE", "5"))),
+)
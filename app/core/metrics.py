@@ -0,0 +1,231 @@
+# app/core/metrics.py
+"""
+リクエストのメトリクス（Prometheusのテキスト形式で出力）
+
+MetricsMiddleware がルートのテンプレート（例: /api/books/{book_id}）ごとに
+レイテンシのヒストグラム・ステータスコード別の件数・処理中の件数を記録し、
+render() で /metrics 用のテキストにする。コネクションプールなどその時点の値は
+register_callback で登録した関数から出力時に読む。
+
+記録は辞書の加算だけなので、1リクエストあたりのオーバーヘッドは数マイクロ秒程度。
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# レイテンシのバケット（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """増えるだけの値（ラベルごと）"""
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] += amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in items]
+
+
+class Gauge(Counter):
+    """増減する値（処理中の件数など）"""
+    type = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: Labels = (), value: float = 0) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    """値の分布（バケットごとの件数と合計）"""
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # ラベルごとに [各バケットの件数..., +Infの件数], 合計
+        self._counts: Dict[Labels, List[int]] = {}
+        self._sums: Dict[Labels, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(labels)
+            if counts is None:
+                counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self._sums[labels] += value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(counts), self._sums[labels]) for labels, counts in self._counts.items()]
+        lines = []
+        names = self.labelnames + ("le",)
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class _Callback:
+    """出力時に関数を呼んで値を読むメトリクス"""
+
+    def __init__(self, name: str, type: str, help: str, labelnames: Sequence[str],
+                 fn: Callable[[], Dict[Labels, float]]):
+        self.name = name
+        self.type = type
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def collect(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in self.fn().items()]
+
+
+class MetricsRegistry:
+    """メトリクスの登録先"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def register_callback(self, name: str, type: str, help: str, labelnames: Sequence[str],
+                          fn: Callable[[], Dict[Labels, float]]) -> None:
+        """出力時に fn() の値（{ラベルの値のタプル: 値}）を読むメトリクスを登録する"""
+        self._register(_Callback(name, type, help, labelnames, fn))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheusのテキスト形式で出力"""
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = metric.collect()
+            except Exception:
+                # 値を読めないメトリクス（DB未接続など）があっても他は出力する
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+# アプリ全体で共有するレジストリと、リクエストのメトリクス
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests_total", "Total HTTP requests", ("method", "route", "status"))
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+http_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being processed", ("method",))
+
+
+def _route_template(scope) -> str:
+    """マッチしたルートのテンプレート（どのルートにも一致しなければ unmatched）"""
+    # ルーティング後は scope["route"] にマッチしたルートが入る
+    route = scope.get("route")
+    template = getattr(route, "path_format", None)
+    if template is None:
+        return "unmatched"
+    if ":path}" in template:
+        return template
+    # FastAPIのバージョンによっては include_router の prefix を含まないルートが入るので、
+    # 実際のパスからテンプレートと同じ段数を取り除いた残りを prefix として付け直す
+    prefix = scope["path"].rsplit("/", template.count("/"))[0]
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """ルートのテンプレートごとにレイテンシ・件数・処理中の件数を記録するASGIミドルウェア"""
+
+    def __init__(self, app, exclude_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_holder = [500]
+        # ルートはルーティングが終わるまで分からないので、処理中の件数はメソッド単位で数える
+        in_flight_labels = (method,)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        http_in_flight.inc(in_flight_labels)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec(in_flight_labels)
+            route = _route_template(scope)
+            http_request_duration.observe(elapsed, (method, route))
+            http_requests.inc((method, route, str(status_holder[0])))
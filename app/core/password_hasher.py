@@ -0,0 +1,146 @@
+# app/core/password_hasher.py
+"""
+bcryptのハッシュ化・検証をプロセスプールで実行するサービス
+
+bcryptは1回あたり100〜300ms程度CPUを占有するため、async def のエンドポイントから
+直接呼ぶとイベントループ全体が止まってしまう。ここではワーカープロセスに処理を逃がし、
+待ち行列の長さに上限を設けて、溢れた分は即座にエラーにする。
+ワーカー数は既定でCPUコア数の半分にし、ログインが殺到しても残りのコアで他のAPIを処理できるようにする。
+"""
+import asyncio
+import os
+import secrets
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+# ワーカープロセス側で使うCryptContext（プロセスごとに1つだけ作る）
+_pwd_context: Optional[CryptContext] = None
+
+
+def _get_context() -> CryptContext:
+    global _pwd_context
+    if _pwd_context is None:
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+
+def _hash_password(password: str) -> str:
+    """パスワードをハッシュ化（ワーカーで実行される）"""
+    return _get_context().hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    """パスワードを検証（ワーカーで実行される）"""
+    return _get_context().verify(plain_password, hashed_password)
+
+
+class PasswordHasherBusyError(RuntimeError):
+    """ハッシュ処理の待ち行列が上限に達している場合のエラー"""
+
+
+class PasswordHashingService:
+    """プロセスプールでbcryptを実行し、待ち行列の長さと処理時間を記録する"""
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) // 2)
+        # 実行中 + 待機中の合計の上限（デフォルトはワーカー数の4倍）
+        self.max_pending = max_pending or self.max_workers * 4
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._dummy_hash: Optional[str] = None
+
+        # メトリクス
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            except (OSError, NotImplementedError):
+                # プロセスを作れない環境ではスレッドで代用（bcryptはGILを解放する）
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusyError("パスワード処理が混み合っています")
+
+        self._pending += 1
+        self.submitted += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), fn, *args)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._pending -= 1
+            elapsed = time.perf_counter() - started
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        """パスワードをハッシュ化"""
+        return await self._run(_hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """プレーンパスワードとハッシュ化されたパスワードを検証"""
+        return await self._run(_verify_password, plain_password, hashed_password)
+
+    async def verify_dummy(self, plain_password: str) -> bool:
+        """存在しないユーザー用の検証（本物と同じ時間をかけて、常にFalseを返す）
+
+        ユーザーがいない場合だけすぐ返すと、応答時間から登録済みのメールアドレスが分かってしまうため。
+        """
+        await self.warm_up()
+        await self.verify(plain_password, self._dummy_hash)
+        return False
+
+    async def warm_up(self) -> None:
+        """ワーカーを起動し、ダミーのハッシュを作っておく（起動時に呼ぶ）"""
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(secrets.token_hex(16))
+
+    def stats(self) -> dict:
+        """メトリクスのスナップショットを返す"""
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "total_seconds": self.total_seconds,
+            "max_seconds": self.max_seconds,
+        }
+
+    def shutdown(self):
+        """ワーカーを停止"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+# アプリ全体で共有するインスタンス
+password_hasher = PasswordHashingService(
+    max_workers=_env_int("PASSWORD_HASH_WORKERS"),
+    max_pending=_env_int("PASSWORD_HASH_MAX_PENDING"),
+)
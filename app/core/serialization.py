@@ -0,0 +1,33 @@
+# app/core/serialization.py
+"""
+JSONレスポンスの高速なエンコード
+
+orjson が入っていれば使い、無ければ pydantic_core.to_json（pydantic に含まれるRust実装）を使う。
+どちらも datetime をそのままISO形式で出せるので、事前に文字列へ変換しなくてよい。
+FastJSONResponse を返したルートでは FastAPI による response_model の再検証と
+jsonable_encoder を通らないので、件数の多い一覧でも辞書の作り直しが発生しない。
+"""
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson は任意
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """値をJSONのバイト列にする（日時はISO形式）"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return pydantic_core.to_json(content)
+
+
+class FastJSONResponse(Response):
+    """dumps でエンコードするJSONレスポンス"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,10 +1,17 @@
 # app/domain/book.py
-from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime
+from typing import Optional, Sequence
+from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime, Index
+from sqlalchemy.orm import load_only
 from core.database import BaseModel
 
 class Book(BaseModel):
     """本のモデル"""
     __tablename__ = "books"  # テーブル名を指定
+    __table_args__ = (
+        # キーセット方式のページング用（タイトル順 / 貸出中一覧）
+        Index("ix_books_title_id", "title", "id"),
+        Index("ix_books_is_available_id", "is_available", "id"),
+    )
     
     # 基本情報
     title = Column(String(200), nullable=False, index=True)  # タイトル（必須、インデックス付き）
@@ -22,4 +29,29 @@ class Book(BaseModel):
     
     def __repr__(self):
         """オブジェクトの文字列表現"""
-        return f"<Book(id={self.id}, title='{self.title}', author='{self.author}')>"
\ No newline at end of file
+        return f"<Book(id={self.id}, title='{self.title}', author='{self.author}')>"
+
+
+# 返却期限の古い順に貸出中の本を読む（延滞の確認用）。貸出中の行だけの部分インデックスなので、
+# 本が増えても大きくならない
+Index("ix_books_overdue", Book.borrowed_until, Book.id,
+      postgresql_where=Book.is_available == False, sqlite_where=Book.is_available == False)
+
+
+# 列を絞って読むときも必ず読む列（キャッシュ・カーソル・ETagで使う、どれも小さい列）
+BOOK_KEY_COLUMNS = ("id", "title", "is_available", "borrowed_until", "created_at", "updated_at")
+
+def load_book_columns(fields: Optional[Sequence[str]], *extra: str):
+    """
+    指定した列だけを読むローダーオプションを作る（fields が None なら None）
+
+    Raises:
+        ValueError: Bookに無い列が指定された場合
+    """
+    if fields is None:
+        return None
+    names = dict.fromkeys((*BOOK_KEY_COLUMNS, *fields, *extra))
+    unknown = [name for name in names if name not in Book.__table__.columns]
+    if unknown:
+        raise ValueError(f"フィールド {', '.join(unknown)} はありません")
+    return load_only(*(getattr(Book, name) for name in names))
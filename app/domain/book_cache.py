@@ -0,0 +1,155 @@
+# app/domain/book_cache.py
+"""
+本の読み取りキャッシュ（リードスルー）
+
+get_book_by_id / get_book_by_isbn / 一覧の結果をキャッシュし、書き込み時に無効化する。
+キーには世代番号を含めており、
+- 1冊の更新: その本のキーを削除し、一覧の世代を進める
+- 一括取り込みなど対象が特定できない更新: 全体の世代を進める
+ことで、古いエントリを個別に探して消さなくても読まれないようにしている。
+
+読み取り側（AsyncBookService）は DB を読む前に versions() で世代を取得し、その世代で書き込む。
+書き込みの前に世代をもう一度読み、読み取り中に更新が入って世代が進んでいたら入れない。
+一覧は古い世代のキーに入るのでもともと読まれないが、1冊単位のエントリはこの確認で古い結果を防ぐ
+（確認から書き込みまでの間に更新が入った場合だけは、TTLで消えるまで残りうる）。
+
+読み取りレプリカのセッションで読んだ結果は、遅れているかもしれないので入れない。
+レプリカを設定している場合、キャッシュに入るのはプライマリで読んだ結果（書き込みの直後で
+プライマリに送られたクライアントなど）だけになり、読み取りの多くはキャッシュを通らずレプリカに行く。
+"""
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import inspect
+
+from infrastructure.cache import create_cache_from_env
+
+from .book import Book
+from .pagination import Page
+
+GENERATION_KEY = "books:generation"
+LIST_VERSION_KEY = "books:list_version"
+
+# キャッシュする列（JSONにできるよう日時はISO形式の文字列で保存する）
+CACHED_COLUMNS = (
+    "id", "title", "author", "isbn", "description", "pages", "published_year",
+    "is_available", "borrowed_until", "created_at", "updated_at",
+)
+DATETIME_COLUMNS = ("borrowed_until", "created_at", "updated_at")
+
+Versions = Tuple[int, int]
+
+
+def book_to_row(book: Book) -> dict:
+    # 列を絞って読んだ本は、読んでいない列を含めない（遅延ロードさせない）
+    unloaded = inspect(book).unloaded
+    row = {name: getattr(book, name) for name in CACHED_COLUMNS if name not in unloaded}
+    for name in DATETIME_COLUMNS:
+        if row.get(name) is not None:
+            row[name] = row[name].isoformat()
+    return row
+
+
+def row_to_book(row: dict) -> Book:
+    """キャッシュの行から読み取り専用のBookを作る（セッションには属さない）"""
+    values = dict(row)
+    for name in DATETIME_COLUMNS:
+        if values.get(name) is not None:
+            values[name] = datetime.fromisoformat(values[name])
+    return Book(**values)
+
+
+class BookCache:
+    """本のキャッシュ（backend が None の場合は何もしない）"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def versions(self) -> Versions:
+        """(全体の世代, 一覧の世代) を返す"""
+        if not self.enabled:
+            return 0, 0
+        generation, list_version = await self.backend.aget_counters([GENERATION_KEY, LIST_VERSION_KEY])
+        return generation, list_version
+
+    # 読み取り
+    async def get_book(self, versions: Versions, book_id: int) -> Optional[Book]:
+        if not self.enabled:
+            return None
+        row = await self.backend.aget(f"books:{versions[0]}:id:{book_id}")
+        return row_to_book(row) if row is not None else None
+
+    async def get_book_by_isbn(self, versions: Versions, isbn: str) -> Optional[Book]:
+        if not self.enabled:
+            return None
+        row = await self.backend.aget(f"books:{versions[0]}:isbn:{isbn}")
+        return row_to_book(row) if row is not None else None
+
+    async def set_book(self, versions: Versions, book: Book) -> None:
+        if not self.enabled:
+            return
+        row = book_to_row(book)
+        await self.backend.aset(f"books:{versions[0]}:id:{book.id}", row)
+        if book.isbn:
+            await self.backend.aset(f"books:{versions[0]}:isbn:{book.isbn}", row)
+
+    async def get_page(self, versions: Versions, kind: str, *params) -> Optional[Page[Book]]:
+        if not self.enabled:
+            return None
+        cached = await self.backend.aget(self._page_key(versions, kind, params))
+        if cached is None:
+            return None
+        return Page(items=[row_to_book(row) for row in cached["items"]], next_cursor=cached["next_cursor"])
+
+    async def set_page(self, versions: Versions, kind: str, *params, page: Page[Book]) -> None:
+        if not self.enabled:
+            return
+        value = {"items": [book_to_row(book) for book in page.items], "next_cursor": page.next_cursor}
+        await self.backend.aset(self._page_key(versions, kind, params), value)
+
+    @staticmethod
+    def _page_key(versions: Versions, kind: str, params) -> str:
+        generation, list_version = versions
+        return f"books:{generation}:list:{list_version}:{kind}:" + ":".join(str(p) for p in params)
+
+    # 無効化
+    @staticmethod
+    def _book_keys(generation: int, book_ids: Iterable[int], isbns: Iterable[Optional[str]]) -> list:
+        keys = [f"books:{generation}:id:{book_id}" for book_id in book_ids]
+        keys += [f"books:{generation}:isbn:{isbn}" for isbn in isbns if isbn]
+        return keys
+
+    async def invalidate(self, book_ids: Iterable[int] = (), isbns: Iterable[Optional[str]] = ()) -> None:
+        """指定した本のキャッシュと、全ての一覧のキャッシュを無効化"""
+        if not self.enabled:
+            return
+        # 先に一覧の世代を進め、その後で個別のキーを消す
+        await self.backend.aincr(LIST_VERSION_KEY)
+        generation, _ = await self.versions()
+        await self.backend.adelete(*self._book_keys(generation, book_ids, isbns))
+
+    def invalidate_sync(self, book_ids: Iterable[int] = (), isbns: Iterable[Optional[str]] = ()) -> None:
+        """invalidate の同期版（同期セッションのBookServiceから使う）"""
+        if not self.enabled:
+            return
+        self.backend.incr(LIST_VERSION_KEY)
+        generation = self.backend.get_counters([GENERATION_KEY])[0]
+        self.backend.delete(*self._book_keys(generation, book_ids, isbns))
+
+    def invalidate_all_sync(self) -> None:
+        """全てのキャッシュを無効化（一括取り込みなど、対象を特定できない更新の後に使う）"""
+        if self.enabled:
+            self.backend.incr(GENERATION_KEY)
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {"backend": None}
+        return self.backend.info()
+
+
+# アプリ全体で共有するインスタンス
+book_cache = BookCache(create_cache_from_env())
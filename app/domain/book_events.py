@@ -0,0 +1,67 @@
+# app/domain/book_events.py
+"""
+本の変更フィード
+
+BookService / AsyncBookService の書き込み（作成・更新・削除・貸出・返却）をイベントとして流し、
+/api/books/events（SSE）と /api/books/events/ws（WebSocket）から配信する。
+イベントには変わった列だけを入れる（貸出・返却なら is_available と borrowed_until）。
+
+- created / updated / deleted / borrowed / returned: 1冊の変更
+- overdue: 貸出中の本が返却期限を過ぎた（OverdueSweeper が1回だけ流す）
+- reset: 一括取り込みなど対象を特定できない変更。クライアントは一覧を取り直す
+
+フィードはワーカーごと（プロセス内）なので、別ワーカーに再接続した場合は reset から始まる。
+書き込みのイベントはその書き込みを処理したワーカーの購読者にしか届かない。特に overdue は
+OverdueSweeper のリーダーのワーカーだけが流すので、複数ワーカーでは他のワーカーの購読者には届かない
+（延滞は GET /api/books/overdue でも確認できる）。
+"""
+import os
+from typing import Iterable, Optional
+
+from infrastructure.pubsub import EventHub
+
+from .book import Book
+from .book_cache import book_to_row
+
+BOOK_EVENT_BUFFER = int(os.getenv("BOOK_EVENT_BUFFER", "1000"))
+BOOK_EVENT_QUEUE = int(os.getenv("BOOK_EVENT_QUEUE", "1000"))
+
+# 貸出・返却で変わる列
+LOAN_COLUMNS = ("is_available", "borrowed_until")
+
+book_events = EventHub(buffer_size=BOOK_EVENT_BUFFER, max_queue=BOOK_EVENT_QUEUE)
+
+
+def _changes(book: Book, columns: Optional[Iterable[str]] = None) -> dict:
+    row = book_to_row(book)
+    if columns is None:
+        return row
+    return {name: row[name] for name in columns if name in row}
+
+
+def publish_created(book: Book) -> None:
+    book_events.publish("created", book.id, _changes(book))
+
+
+def publish_updated(book: Book, columns: Iterable[str]) -> None:
+    book_events.publish("updated", book.id, _changes(book, [*columns, "updated_at"]))
+
+
+def publish_deleted(book_id: int) -> None:
+    book_events.publish("deleted", book_id)
+
+
+def publish_borrowed(book: Book) -> None:
+    book_events.publish("borrowed", book.id, _changes(book, LOAN_COLUMNS))
+
+
+def publish_returned(book: Book) -> None:
+    book_events.publish("returned", book.id, _changes(book, LOAN_COLUMNS))
+
+
+def publish_overdue(book: Book) -> None:
+    book_events.publish("overdue", book.id, _changes(book, ["borrowed_until"]))
+
+
+def publish_reset() -> None:
+    book_events.publish("reset")
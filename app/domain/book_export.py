@@ -0,0 +1,83 @@
+# app/domain/book_export.py
+"""
+本の一覧をNDJSON/CSVでストリーミング出力する
+
+サーバーサイドカーソルで一定件数ずつ取り出し、そのままバイト列にして返すので、
+件数が増えてもメモリ使用量は一定で、クエリが終わる前に最初のデータを送り始められる。
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import select
+
+from .book import Book
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_BATCH_SIZE = 1000
+
+# 出力する列（ORMオブジェクトを作らないよう列を直接SELECTする）
+EXPORT_COLUMNS = (
+    Book.id,
+    Book.title,
+    Book.author,
+    Book.isbn,
+    Book.description,
+    Book.pages,
+    Book.published_year,
+    Book.is_available,
+    Book.borrowed_until,
+    Book.created_at,
+    Book.updated_at,
+)
+EXPORT_FIELDS = tuple(column.key for column in EXPORT_COLUMNS)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_json_encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_ndjson(rows: Sequence[tuple]) -> bytes:
+    """行のまとまりをNDJSON（1行1オブジェクト）のバイト列にする"""
+    encode = _json_encoder.encode
+    fields = EXPORT_FIELDS
+    return "".join([encode(dict(zip(fields, row))) + "\n" for row in rows]).encode("utf-8")
+
+
+def encode_csv(rows: Sequence[tuple], header: bool = False) -> bytes:
+    """行のまとまりをCSVのバイト列にする"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(
+        [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue().encode("utf-8")
+
+
+async def iter_export(db, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """本をID順に batch_size 件ずつ取り出し、エンコード済みのバイト列を順に返す"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"フォーマット '{fmt}' には対応していません")
+
+    if fmt == "csv":
+        yield encode_csv([], header=True)
+
+    stmt = select(*EXPORT_COLUMNS).order_by(Book.id).execution_options(yield_per=batch_size)
+    result = await db.stream(stmt)
+    async for rows in result.partitions(batch_size):
+        yield encode_ndjson(rows) if fmt == "ndjson" else encode_csv(rows)
@@ -0,0 +1,219 @@
+# app/domain/book_import.py
+"""
+本の一括取り込み（CSV / NDJSON）
+
+入力を batch_size 件ずつ検証し、ISBNをキーにupsertする。PostgreSQL + psycopg2 では
+一時テーブルへ COPY してから INSERT ... ON CONFLICT でまとめて反映し、それ以外では
+executemany で反映する。1行ずつ commit しないので、大量データでも速い。
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, TextIO, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from .book import Book
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+# 取り込み対象の列と、文字列の最大長（Bookモデルの定義に合わせる）
+IMPORT_FIELDS = ("title", "author", "isbn", "description", "pages", "published_year")
+STRING_LIMITS = {"title": 200, "author": 100, "isbn": 17, "description": None}
+INTEGER_FIELDS = ("pages", "published_year")
+REQUIRED_FIELDS = ("title", "author")
+
+
+@dataclass
+class RowError:
+    """取り込めなかった行"""
+    line: int
+    error: str
+
+
+@dataclass
+class ImportReport:
+    """取り込み結果"""
+    received: int = 0
+    loaded: int = 0
+    failed: int = 0
+    errors: List[RowError] = field(default_factory=list)
+
+    def add_error(self, line: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(line=line, error=error))
+
+    def to_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "loaded": self.loaded,
+            "failed": self.failed,
+            "errors": [{"line": e.line, "error": e.error} for e in self.errors],
+        }
+
+
+def iter_records(source: TextIO, fmt: str) -> Iterator[Tuple[int, object]]:
+    """入力から (行番号, レコード) を順に取り出す（壊れた行はレコードの代わりに例外を返す）"""
+    if fmt == "csv":
+        reader = csv.DictReader(source)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == "ndjson":
+        for line_no, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, ValueError(f"JSONとして読めません: {e}")
+    else:
+        raise ValueError(f"フォーマット '{fmt}' には対応していません")
+
+
+def validate_record(record: object) -> dict:
+    """1件分のレコードを検証し、Bookの列に合わせた辞書を返す
+
+    Raises:
+        ValueError: 必須項目が無い、型や長さが不正な場合
+    """
+    if isinstance(record, Exception):
+        raise ValueError(str(record))
+    if not isinstance(record, dict):
+        raise ValueError("オブジェクトではありません")
+
+    row = {}
+    for name in IMPORT_FIELDS:
+        value = record.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in ("", None):
+            value = None
+        elif name in INTEGER_FIELDS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} は整数で指定してください")
+        else:
+            value = str(value)
+            limit = STRING_LIMITS[name]
+            if limit is not None and len(value) > limit:
+                raise ValueError(f"{name} は{limit}文字以内で指定してください")
+        row[name] = value
+
+    for name in REQUIRED_FIELDS:
+        if row[name] is None:
+            raise ValueError(f"{name} は必須です")
+    return row
+
+
+class BookImporter:
+    """検証済みの行をまとめてDBに反映する"""
+
+    def __init__(self, db: Session, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.dialect_name = db.get_bind().dialect.name
+        self.report = ImportReport()
+
+    def import_records(self, records: Iterable[Tuple[int, object]]) -> ImportReport:
+        """(行番号, レコード) を batch_size 件ずつ検証・反映する"""
+        batch: List[Tuple[int, dict]] = []
+        for line, record in records:
+            self.report.received += 1
+            try:
+                batch.append((line, validate_record(record)))
+            except ValueError as e:
+                self.report.add_error(line, str(e))
+                continue
+            if len(batch) >= self.batch_size:
+                self._load_batch(batch)
+                batch = []
+        if batch:
+            self._load_batch(batch)
+        return self.report
+
+    def _load_batch(self, batch: List[Tuple[int, dict]]) -> None:
+        received = len(batch)
+        # 同じバッチ内でISBNが重複すると ON CONFLICT が失敗するため、後の行を優先する
+        deduplicated = {}
+        for line, row in batch:
+            key = row["isbn"] if row["isbn"] is not None else ("line", line)
+            deduplicated[key] = (line, row)
+        batch = list(deduplicated.values())
+
+        try:
+            if self._can_copy():
+                self._copy_rows([row for _, row in batch])
+            else:
+                self._upsert_rows([row for _, row in batch])
+            self.db.commit()
+            self.report.loaded += received
+        except Exception:
+            # どの行が原因か特定するため、1行ずつやり直す
+            self.db.rollback()
+            self._load_rows_individually(batch)
+
+    def _load_rows_individually(self, batch: List[Tuple[int, dict]]) -> None:
+        for line, row in batch:
+            try:
+                with self.db.begin_nested():
+                    self._upsert_rows([row])
+                self.report.loaded += 1
+            except Exception as e:
+                self.report.add_error(line, str(getattr(e, "orig", e)).strip())
+        self.db.commit()
+
+    def _can_copy(self) -> bool:
+        # COPYはpsycopg2の copy_expert を使う（asyncpgなど他のドライバではexecutemany）
+        bind = self.db.get_bind()
+        return bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2"
+
+    def _copy_rows(self, rows: List[dict]) -> None:
+        """一時テーブルにCOPYしてから INSERT ... ON CONFLICT でまとめてupsertする"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["\\N" if row[name] is None else row[name] for name in IMPORT_FIELDS])
+        buffer.seek(0)
+
+        columns = ", ".join(IMPORT_FIELDS)
+        self.db.execute(text(
+            "CREATE TEMP TABLE IF NOT EXISTS books_import ("
+            "title varchar(200), author varchar(100), isbn varchar(17), "
+            "description text, pages integer, published_year integer"
+            ") ON COMMIT DELETE ROWS"
+        ))
+        cursor = self.db.connection().connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY books_import ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+            )
+        finally:
+            cursor.close()
+        updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in IMPORT_FIELDS if name != "isbn")
+        self.db.execute(text(
+            f"INSERT INTO books ({columns}, is_available) "
+            f"SELECT {columns}, true FROM books_import "
+            f"ON CONFLICT (isbn) DO UPDATE SET {updates}, updated_at = now()"
+        ))
+
+    def _upsert_rows(self, rows: List[dict]) -> None:
+        """executemany で INSERT ... ON CONFLICT を実行する"""
+        if self.dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif self.dialect_name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise NotImplementedError(f"{self.dialect_name} への一括取り込みには対応していません")
+
+        stmt = insert(Book.__table__)
+        updates = {name: stmt.excluded[name] for name in IMPORT_FIELDS if name != "isbn"}
+        updates["updated_at"] = func.now()
+        stmt = stmt.on_conflict_do_update(index_elements=[Book.isbn], set_=updates)
+        self.db.execute(stmt, [dict(row, is_available=True) for row in rows])
+
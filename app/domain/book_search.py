@@ -0,0 +1,183 @@
+# app/domain/book_search.py
+"""
+本の全文検索
+
+PostgreSQLでは tsvector（全文検索）と pg_trgm（部分一致）のGINインデックスを使い、
+ランキングとハイライト付きで検索する。SQLiteなどそれ以外のDBでは LIKE で検索し、
+ランキングとハイライトはPython側で作る。
+"""
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Float, and_, bindparam, case, cast, func, literal_column, or_, select, text
+from sqlalchemy.sql import Select
+
+from .book import Book, load_book_columns
+
+# インデックスと検索クエリで同じ式を使う必要がある（式インデックスを効かせるため）
+DOCUMENT_SQL = (
+    "to_tsvector('simple', coalesce(title, '') || ' ' || "
+    "coalesce(author, '') || ' ' || coalesce(description, ''))"
+)
+
+# PostgreSQL用の検索インデックス（create_tables.py から作成する）
+SEARCH_INDEX_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_books_search_document ON books USING gin ({DOCUMENT_SQL})",
+    "CREATE INDEX IF NOT EXISTS ix_books_title_trgm ON books USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_books_author_trgm ON books USING gin (author gin_trgm_ops)",
+]
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+SNIPPET_WIDTH = 60
+
+
+@dataclass
+class SearchHit:
+    """検索結果1件分"""
+    book: Book
+    rank: float
+    snippet: Optional[str]
+
+
+def create_search_indexes(bind) -> None:
+    """検索用インデックスを作成（PostgreSQL以外では何もしない）"""
+    if bind.dialect.name != "postgresql":
+        return
+    with bind.begin() as conn:
+        for ddl in SEARCH_INDEX_DDL:
+            conn.execute(text(ddl))
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _to_prefix_tsquery(query: str) -> str:
+    """入力途中の語も拾えるよう、各単語を前方一致にした tsquery 文字列を作る"""
+    terms = re.findall(r"\w+", query)
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def make_snippet(value: Optional[str], query: str, width: int = SNIPPET_WIDTH) -> Optional[str]:
+    """最初に一致した箇所の前後を切り出し、一致部分を <mark> で囲む"""
+    if not value:
+        return None
+    position = value.lower().find(query.lower())
+    if position < 0:
+        return None
+    start = max(0, position - width // 2)
+    end = min(len(value), position + len(query) + width // 2)
+    matched = value[position:position + len(query)]
+    return (
+        ("…" if start > 0 else "")
+        + value[start:position]
+        + HIGHLIGHT_START + matched + HIGHLIGHT_END
+        + value[position + len(query):end]
+        + ("…" if end < len(value) else "")
+    )
+
+
+class BookSearchEngine:
+    """DBの種類に応じて検索クエリを組み立て、結果を SearchHit に変換する"""
+
+    def __init__(self, dialect_name: str):
+        self.dialect_name = dialect_name
+
+    def build_query(self, query: str, limit: int = 20, after: Optional[list] = None,
+                    fields: Optional[Sequence[str]] = None, filters: Sequence = ()) -> Select:
+        """(Book, rank, snippet) を返すSELECT文を組み立てる
+
+        after には前ページ最後の [rank, id] を渡す（キーセット方式）。
+        次ページの有無を判定するため limit + 1 件取得する。
+        fields を渡すと Book はその列だけを読む。filters には追加の絞り込み条件（ファセット）を渡す。
+        """
+        if self.dialect_name == "postgresql":
+            stmt = self._build_postgresql_query(query, limit, after, filters)
+            # ハイライトはSQL側で作るので description を読む必要はない
+            option = load_book_columns(fields)
+        else:
+            stmt = self._build_fallback_query(query, limit, after, filters)
+            # ハイライトをPython側で作るため description も読む
+            option = load_book_columns(fields, "description")
+        return stmt.options(option) if option is not None else stmt
+
+    @staticmethod
+    def _after(rank, after: Optional[list]):
+        """(rank DESC, id ASC) の並びで、前ページ最後の行より後ろを表す条件"""
+        last_rank, last_id = after
+        return or_(rank < last_rank, and_(rank == last_rank, Book.id > last_id))
+
+    def to_hits(self, rows, query: str) -> List[SearchHit]:
+        hits = []
+        for book, rank, snippet in rows:
+            if snippet is None:
+                snippet = make_snippet(book.description, query) or make_snippet(book.title, query)
+            hits.append(SearchHit(book=book, rank=float(rank or 0), snippet=snippet))
+        return hits
+
+    def _build_postgresql_query(self, query: str, limit: int, after: Optional[list], filters: Sequence) -> Select:
+        document = literal_column(DOCUMENT_SQL)
+        tsquery_text = _to_prefix_tsquery(query)
+        tsquery = func.to_tsquery(literal_column("'simple'"), bindparam("tsquery", tsquery_text))
+        pattern = f"%{_escape_like(query)}%"
+
+        # tsqueryが空（記号だけの入力など）の場合は部分一致のみで検索
+        conditions = Book.title.ilike(pattern, escape="\\") | Book.author.ilike(pattern, escape="\\")
+        rank = func.similarity(Book.title, query) + func.similarity(Book.author, query)
+        if tsquery_text:
+            conditions = conditions | document.op("@@")(tsquery)
+            rank = rank + func.ts_rank(document, tsquery)
+        # カーソルに入れた値と誤差なく比較できるよう倍精度に揃える
+        rank = cast(rank, Float)
+        if filters:
+            conditions = and_(conditions, *filters)
+        if after is not None:
+            conditions = and_(conditions, self._after(rank, after))
+
+        # まずIDとスコアだけで絞り込み、ハイライトは返す行だけ計算する
+        ranked = (
+            select(Book.id.label("id"), rank.label("rank"))
+            .where(conditions)
+            .order_by(rank.desc(), Book.id)
+            .limit(limit + 1)
+            .subquery()
+        )
+        snippet = func.ts_headline(
+            literal_column("'simple'"),
+            func.coalesce(Book.description, Book.title),
+            tsquery,
+            f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=20, MinWords=5",
+        ) if tsquery_text else literal_column("NULL")
+        return (
+            select(Book, ranked.c.rank, snippet.label("snippet"))
+            .join(ranked, Book.id == ranked.c.id)
+            .order_by(ranked.c.rank.desc(), Book.id)
+        )
+
+    def _build_fallback_query(self, query: str, limit: int, after: Optional[list], filters: Sequence) -> Select:
+        pattern = f"%{_escape_like(query)}%"
+        prefix = f"{_escape_like(query)}%"
+        # タイトル > 著者 > 説明 の順に重み付け、前方一致はさらに加点
+        rank = (
+            case((Book.title.ilike(prefix, escape="\\"), 4.0), (Book.title.ilike(pattern, escape="\\"), 3.0), else_=0.0)
+            + case((Book.author.ilike(pattern, escape="\\"), 2.0), else_=0.0)
+            + case((Book.description.ilike(pattern, escape="\\"), 1.0), else_=0.0)
+        )
+        conditions = (
+            Book.title.ilike(pattern, escape="\\")
+            | Book.author.ilike(pattern, escape="\\")
+            | Book.description.ilike(pattern, escape="\\")
+        )
+        if filters:
+            conditions = and_(conditions, *filters)
+        if after is not None:
+            conditions = and_(conditions, self._after(rank, after))
+        return (
+            select(Book, rank.label("rank"), literal_column("NULL").label("snippet"))
+            .where(conditions)
+            .order_by(rank.desc(), Book.id)
+            .limit(limit + 1)
+        )
@@ -1,8 +1,211 @@
 # app/domain/book_service.py
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, TextIO
 from datetime import datetime, timedelta
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
-from .book import Book
+from sqlalchemy.ext.asyncio import AsyncSession
+from infrastructure.db import is_replica_session
+from .book import Book, load_book_columns
+from .book_cache import Versions, book_cache
+from .book_events import (
+    publish_borrowed, publish_created, publish_deleted, publish_overdue, publish_reset, publish_returned,
+    publish_updated,
+)
+from .book_export import EXPORT_BATCH_SIZE, iter_export
+from .book_import import IMPORT_BATCH_SIZE, BookImporter, ImportReport, iter_records
+from .book_search import BookSearchEngine, SearchHit
+from .book_stats import book_stats
+from .loan import OPEN_LOAN_CONDITION, Loan
+from .pagination import (
+    DEFAULT_PAGE_SIZE, Page, apply_keyset, decode_cursor, decode_time_cursor, encode_cursor, make_page,
+)
+
+# キーセット方式のページングで使えるソートキー（最後は必ず一意なid）
+BOOK_SORT_KEYS = {
+    "id": (Book.id,),
+    "title": (Book.title, Book.id),
+}
+
+# 貸し出し期間
+LOAN_PERIOD = timedelta(weeks=1)
+
+# 延滞中の本のカーソルのソート名（返却期限の古い順。ix_books_overdue の順）
+OVERDUE_SORT = "borrowed_until:asc"
+
+# まとめて取得できるIDの数の上限と、1回の IN (...) に入れる数
+MAX_BATCH_GET_IDS = 1000
+BATCH_GET_CHUNK_SIZE = 500
+
+# まとめて貸出・返却できる冊数の上限（1回の UPDATE に入れる）
+MAX_BATCH_LOAN_IDS = 100
+
+# まとめて貸出・返却のモード
+# - atomic:      1冊でも失敗したら全て取り消す（all-or-nothing）
+# - best_effort: できた本だけ確定する
+LOAN_MODES = ("atomic", "best_effort")
+
+
+class BookConflictError(ValueError):
+    """本の状態が操作と合わない場合のエラー"""
+
+
+class BookNotAvailableError(BookConflictError):
+    """既に貸し出し中の本を借りようとした場合のエラー"""
+
+
+class BookNotBorrowedError(BookConflictError):
+    """貸し出されていない本を返却しようとした場合のエラー"""
+
+
+def _borrow_statement(*book_ids: int):
+    """貸出可能なときだけ貸出中にする UPDATE ... RETURNING（確認と更新を1文で行う）"""
+    return (
+        update(Book)
+        .where(_id_condition(book_ids), Book.is_available == True)
+        .values(is_available=False, borrowed_until=datetime.now() + LOAN_PERIOD)
+        .returning(Book)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+
+
+def _return_statement(*book_ids: int):
+    """貸出中のときだけ返却済みにする UPDATE ... RETURNING"""
+    return (
+        update(Book)
+        .where(_id_condition(book_ids), Book.is_available == False)
+        .values(is_available=True, borrowed_until=None)
+        .returning(Book)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+
+
+def _id_condition(book_ids: Sequence[int]):
+    return Book.id == book_ids[0] if len(book_ids) == 1 else Book.id.in_(book_ids)
+
+
+def _open_loans_statement(books: Sequence[Book], user_id: Optional[int]):
+    """貸し出した本の貸出履歴を追加する INSERT（何冊でも1文）"""
+    return insert(Loan).values([
+        # borrowed_until は貸出時刻 + LOAN_PERIOD として UPDATE で入れた値
+        {"book_id": book.id, "user_id": user_id,
+         "borrowed_at": book.borrowed_until - LOAN_PERIOD, "due_at": book.borrowed_until}
+        for book in books
+    ])
+
+
+def _close_loans_statement(books: Sequence[Book]):
+    """返却した本の未返却の貸出履歴を閉じる UPDATE（未返却の行の部分インデックスで探す）"""
+    return (
+        update(Loan)
+        .where(Loan.book_id.in_([book.id for book in books]), OPEN_LOAN_CONDITION)
+        .values(returned_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+@dataclass
+class LoanOutcome:
+    """まとめて貸出・返却した1冊の結果
+
+    status: borrowed / returned（成功）、not_found、unavailable（貸出中）、
+            not_borrowed（貸し出されていない）、aborted（atomic で他の本が失敗したため取り消し）
+    """
+    id: int
+    status: str
+    book: Optional[Book] = None
+
+
+@dataclass
+class LoanBatchReport:
+    """まとめて貸出・返却した結果（results は指定した順）"""
+    mode: str
+    committed: bool
+    results: List[LoanOutcome] = field(default_factory=list)
+
+    @property
+    def books(self) -> List[Book]:
+        """確定した本"""
+        return [outcome.book for outcome in self.results if outcome.book is not None]
+
+
+def _loan_ids(book_ids: Iterable[int], mode: str) -> List[int]:
+    """
+    まとめて貸出・返却する本のID（重複を除く）
+
+    Raises:
+        ValueError: モードが不正な場合、冊数が0または多すぎる場合
+    """
+    if mode not in LOAN_MODES:
+        raise ValueError(f"mode は {' / '.join(LOAN_MODES)} のいずれかです")
+    ids = list(dict.fromkeys(book_ids))
+    if not ids:
+        raise ValueError("本のIDを指定してください")
+    if len(ids) > MAX_BATCH_LOAN_IDS:
+        raise ValueError(f"一度に貸出・返却できるのは{MAX_BATCH_LOAN_IDS}冊までです")
+    return ids
+
+
+def _loan_report(ids: List[int], mode: str, updated: Dict[int, Book], existing: Set[int],
+                 done: str, conflict: str) -> LoanBatchReport:
+    """UPDATE できた本（updated）と、できなかった本のうち存在する本（existing）から結果を作る"""
+    committed = mode == "best_effort" or len(updated) == len(ids)
+    report = LoanBatchReport(mode=mode, committed=committed)
+    for book_id in ids:
+        if book_id in updated:
+            book = updated[book_id]
+            report.results.append(LoanOutcome(book_id, done, book) if committed else LoanOutcome(book_id, "aborted"))
+        else:
+            report.results.append(LoanOutcome(book_id, conflict if book_id in existing else "not_found"))
+    return report
+
+
+@dataclass
+class BookBatch:
+    """IDを指定してまとめて取得した結果（items は指定した順、無かったIDは missing）"""
+    items: List[Book] = field(default_factory=list)
+    missing: List[int] = field(default_factory=list)
+
+
+def _unique_ids(book_ids: Iterable[int]) -> List[int]:
+    """重複を除いたID（最初に出てきた順）
+
+    Raises:
+        ValueError: IDが多すぎる場合
+    """
+    ids = list(dict.fromkeys(book_ids))
+    if len(ids) > MAX_BATCH_GET_IDS:
+        raise ValueError(f"一度に取得できるのは{MAX_BATCH_GET_IDS}件までです")
+    return ids
+
+
+def _batch_get_statements(ids: List[int], fields: Optional[Sequence[str]]):
+    """IDを BATCH_GET_CHUNK_SIZE 件ずつに分けた SELECT ... WHERE id IN (...)"""
+    option = load_book_columns(fields)
+    for start in range(0, len(ids), BATCH_GET_CHUNK_SIZE):
+        stmt = select(Book).where(Book.id.in_(ids[start:start + BATCH_GET_CHUNK_SIZE]))
+        yield stmt.options(option) if option is not None else stmt
+
+
+def _make_batch(ids: List[int], found: Dict[int, Book]) -> BookBatch:
+    return BookBatch(
+        items=[found[book_id] for book_id in ids if book_id in found],
+        missing=[book_id for book_id in ids if book_id not in found],
+    )
+
+
+def _overdue_key(book: Book) -> tuple:
+    return (book.borrowed_until.isoformat(), book.id)
+
+
+def overdue_cursor_after(book: Book) -> str:
+    """その本の次から延滞中の本を読むカーソル（OverdueSweeper が処理済みの位置として持つ）"""
+    return encode_cursor(OVERDUE_SORT, _overdue_key(book))
+
+
+def _fields_key(fields: Optional[Sequence[str]]) -> str:
+    """キャッシュのキーに使う列の指定（全列なら '*'）"""
+    return "*" if fields is None else ",".join(sorted(fields))
 
 class BookService:
     """本に関するデータベース操作をまとめたサービスクラス"""
@@ -26,6 +229,9 @@ class BookService:
         self.db.add(book)        # セッションに追加
         self.db.commit()         # データベースに保存
         self.db.refresh(book)    # 作成されたIDなどを取得
+        book_cache.invalidate_sync()  # 一覧のキャッシュを無効化
+        book_stats.created(book)
+        publish_created(book)
         return book
     
     # READ - 本を読み取り
@@ -37,6 +243,14 @@ class BookService:
         """ISBNで本を取得"""
         return self.db.query(Book).filter(Book.isbn == isbn).first()
     
+    def get_books_by_ids(self, book_ids: Iterable[int], fields: Optional[Sequence[str]] = None) -> BookBatch:
+        """IDのリストで本をまとめて取得（指定した順。無いIDは missing）"""
+        ids = _unique_ids(book_ids)
+        found = {}
+        for stmt in _batch_get_statements(ids, fields):
+            found.update((book.id, book) for book in self.db.execute(stmt).scalars())
+        return _make_batch(ids, found)
+    
     def get_books_by_author(self, author: str) -> List[Book]:
         """著者で本を検索"""
         return self.db.query(Book).filter(Book.author.ilike(f"%{author}%")).all()
@@ -51,6 +265,8 @@ class BookService:
         book = self.get_book_by_id(book_id)
         if not book:
             return None
+        old_isbn = book.isbn
+        before = book_stats.facet_values(book)
         
         # 渡された項目のみ更新
         for key, value in kwargs.items():
@@ -59,6 +275,9 @@ class BookService:
         
         self.db.commit()
         self.db.refresh(book)
+        book_cache.invalidate_sync([book_id], [old_isbn, book.isbn])
+        book_stats.updated(before, book)
+        publish_updated(book, [key for key in kwargs if hasattr(book, key)])
         return book
     
     # DELETE - 本を削除
@@ -70,53 +289,472 @@ class BookService:
         
         self.db.delete(book)
         self.db.commit()
+        book_cache.invalidate_sync([book_id], [book.isbn])
+        book_stats.deleted(book)
+        publish_deleted(book_id)
         return True
     
     # その他の便利メソッド
-    def search_books(self, query: str) -> List[Book]:
-        """タイトルまたは著者で本を検索"""
-        return self.db.query(Book).filter(
-            (Book.title.ilike(f"%{query}%")) | 
-            (Book.author.ilike(f"%{query}%"))
-        ).all()
+    def search_books(self, query: str, limit: int = 20) -> List[Book]:
+        """タイトル・著者・説明で本を検索（関連度順）"""
+        engine = BookSearchEngine(self.db.get_bind().dialect.name)
+        rows = self.db.execute(engine.build_query(query, limit)).all()
+        return [hit.book for hit in engine.to_hits(rows[:limit], query)]
     
     def get_available_books(self) -> List[Book]:
         """利用可能な本のみ取得"""
         return self.db.query(Book).filter(Book.is_available == True).all()
     
     # 貸し出し・返却機能
-    def borrow_book(self, book_id: int) -> Optional[Book]:
-        """本を貸し出し（1週間）"""
-        book = self.get_book_by_id(book_id)
-        if not book:
-            return None
-        
-        # 既に貸し出し中の場合はエラー
-        if not book.is_available:
-            return None
-        
-        # 1週間後の日付を設定
-        borrowed_until = datetime.now() + timedelta(weeks=1)
-        
-        book.is_available = False
-        book.borrowed_until = borrowed_until
+    def borrow_book(self, book_id: int, user_id: Optional[int] = None) -> Optional[Book]:
+        """
+        本を貸し出し（1週間）。貸出履歴も同じトランザクションで追加する
         
+        Returns:
+            Book: 貸し出した本、本が存在しない場合はNone
+            
+        Raises:
+            BookNotAvailableError: 既に貸し出し中の場合
+        """
+        book = self.db.execute(_borrow_statement(book_id)).scalars().first()
+        if book is not None:
+            self.db.execute(_open_loans_statement([book], user_id))
         self.db.commit()
-        self.db.refresh(book)
+        if book is None:
+            # 更新できなかった場合だけ、存在しないのか貸出中なのかを確認する
+            if self.db.scalar(select(Book.id).where(Book.id == book_id)) is None:
+                return None
+            raise BookNotAvailableError("この本は貸し出し中です")
+        book_cache.invalidate_sync([book_id], [book.isbn])
+        book_stats.borrowed()
+        publish_borrowed(book)
         return book
     
     def return_book(self, book_id: int) -> Optional[Book]:
-        """本を返却"""
-        book = self.get_book_by_id(book_id)
-        if not book:
-            return None
-        
-        book.is_available = True
-        book.borrowed_until = None
+        """
+        本を返却
         
+        Returns:
+            Book: 返却された本、本が存在しない場合はNone
+            
+        Raises:
+            BookNotBorrowedError: 貸し出されていない場合
+        """
+        book = self.db.execute(_return_statement(book_id)).scalars().first()
+        if book is not None:
+            self.db.execute(_close_loans_statement([book]))
         self.db.commit()
-        self.db.refresh(book)
+        if book is None:
+            if self.db.scalar(select(Book.id).where(Book.id == book_id)) is None:
+                return None
+            raise BookNotBorrowedError("この本は貸し出されていません")
+        book_cache.invalidate_sync([book_id], [book.isbn])
+        book_stats.returned()
+        publish_returned(book)
         return book
+
+    def borrow_books(self, book_ids: Iterable[int], mode: str = "atomic",
+                     user_id: Optional[int] = None) -> LoanBatchReport:
+        """
+        複数の本をまとめて貸し出し（1つの UPDATE、1つのトランザクション）
+
+        Raises:
+            ValueError: モードが不正な場合、冊数が0または多すぎる場合
+        """
+        report = self._update_loans(_loan_ids(book_ids, mode), mode, _borrow_statement, "borrowed", "unavailable",
+                                    lambda books: _open_loans_statement(books, user_id))
+        book_stats.borrowed(len(report.books))
+        for book in report.books:
+            publish_borrowed(book)
+        return report
+
+    def return_books(self, book_ids: Iterable[int], mode: str = "atomic") -> LoanBatchReport:
+        """
+        複数の本をまとめて返却（1つの UPDATE、1つのトランザクション）
+
+        Raises:
+            ValueError: モードが不正な場合、冊数が0または多すぎる場合
+        """
+        report = self._update_loans(_loan_ids(book_ids, mode), mode, _return_statement, "returned", "not_borrowed",
+                                    _close_loans_statement)
+        book_stats.returned(len(report.books))
+        for book in report.books:
+            publish_returned(book)
+        return report
+
+    def _update_loans(self, ids: List[int], mode: str, statement, done: str, conflict: str,
+                      history) -> LoanBatchReport:
+        updated = {book.id: book for book in self.db.execute(statement(*ids)).scalars()}
+        existing = set()
+        if len(updated) < len(ids):
+            # 更新できなかった本だけ、存在するかを確認する
+            failed = [book_id for book_id in ids if book_id not in updated]
+            existing = set(self.db.scalars(select(Book.id).where(Book.id.in_(failed))))
+        report = _loan_report(ids, mode, updated, existing, done, conflict)
+        if report.committed:
+            if report.books:
+                self.db.execute(history(report.books))
+            self.db.commit()
+            if report.books:
+                book_cache.invalidate_sync([book.id for book in report.books], [book.isbn for book in report.books])
+        else:
+            self.db.rollback()
+        return report
+
     def get_borrowed_books(self) -> List[Book]:
         """貸出中の本一覧を取得"""
         return self.db.query(Book).filter(Book.is_available == False).all()
+
+    # 一括取り込み
+    def import_books(self, source: TextIO, fmt: str, batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+        """CSV / NDJSON から本を一括取り込み（ISBNが同じ本は上書き）"""
+        try:
+            return BookImporter(self.db, batch_size).import_records(iter_records(source, fmt))
+        finally:
+            # どの本が変わったか特定できないので、キャッシュ全体を無効化
+            book_cache.invalidate_all_sync()
+            book_stats.invalidate()
+            publish_reset()
+
+
+class AsyncBookService:
+    """BookServiceの非同期版（AsyncSessionを利用し、イベントループをブロックしない）"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # CREATE - 本を作成
+    async def create_book(self, title: str, author: str, isbn: str = None,
+                          description: str = None, pages: int = None,
+                          published_year: int = None) -> Book:
+        """新しい本を作成"""
+        book = Book(
+            title=title,
+            author=author,
+            isbn=isbn,
+            description=description,
+            pages=pages,
+            published_year=published_year
+        )
+        self.db.add(book)
+        await self.db.commit()
+        await self.db.refresh(book)
+        await book_cache.invalidate()  # 一覧のキャッシュを無効化
+        book_stats.created(book)
+        publish_created(book)
+        return book
+
+    # READ - 本を読み取り
+    async def get_book_by_id(self, book_id: int) -> Optional[Book]:
+        """IDで本を取得（キャッシュ優先。返す本は読み取り専用として扱うこと）"""
+        versions = await book_cache.versions()
+        book = await book_cache.get_book(versions, book_id)
+        if book is None:
+            book = await self._load_book(book_id)
+            if book is not None and await self._may_fill_cache(versions):
+                await book_cache.set_book(versions, book)
+        return book
+
+    async def _may_fill_cache(self, versions: Versions) -> bool:
+        """
+        DBから読んだ結果を共有キャッシュに入れてよいか
+
+        レプリカから読んだ結果は遅れているかもしれないので入れない（プライマリで読んだ人が入れる）。
+        読んでいる間に書き込みで無効化された場合（世代が進んだ場合）も、古い結果かもしれないので入れない。
+        """
+        if is_replica_session(self.db):
+            return False
+        return await book_cache.versions() == versions
+
+    async def _load_book(self, book_id: int) -> Optional[Book]:
+        """IDで本をDBから取得（更新に使うため、キャッシュは使わない）"""
+        result = await self.db.execute(select(Book).where(Book.id == book_id))
+        return result.scalars().first()
+
+    async def get_book_by_isbn(self, isbn: str) -> Optional[Book]:
+        """ISBNで本を取得（キャッシュ優先）"""
+        versions = await book_cache.versions()
+        book = await book_cache.get_book_by_isbn(versions, isbn)
+        if book is None:
+            result = await self.db.execute(select(Book).where(Book.isbn == isbn))
+            book = result.scalars().first()
+            if book is not None and await self._may_fill_cache(versions):
+                await book_cache.set_book(versions, book)
+        return book
+
+    async def get_books_by_ids(self, book_ids: Iterable[int], fields: Optional[Sequence[str]] = None) -> BookBatch:
+        """IDのリストで本をまとめて取得（指定した順。無いIDは missing）
+
+        WHERE id IN (...) を BATCH_GET_CHUNK_SIZE 件ごとに1回実行する（500件までなら1クエリ）。
+
+        Raises:
+            ValueError: IDが多すぎる場合、列名が不正な場合
+        """
+        ids = _unique_ids(book_ids)
+        found = {}
+        for stmt in _batch_get_statements(ids, fields):
+            result = await self.db.execute(stmt)
+            found.update((book.id, book) for book in result.scalars())
+        return _make_batch(ids, found)
+
+    async def get_books_by_author(self, author: str) -> List[Book]:
+        """著者で本を検索"""
+        result = await self.db.execute(select(Book).where(Book.author.ilike(f"%{author}%")))
+        return list(result.scalars().all())
+
+    async def get_all_books(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                            sort: str = "id", order: str = "asc",
+                            fields: Optional[Sequence[str]] = None) -> Page[Book]:
+        """全ての本を取得（キーセット方式のページング、キャッシュ優先）
+
+        fields を渡すとその列だけを読む（読んでいない列は参照しないこと）。
+        """
+        versions = await book_cache.versions()
+        params = (limit, cursor, sort, order, _fields_key(fields))
+        page = await book_cache.get_page(versions, "all", *params)
+        if page is None:
+            page = await self._get_books_page(select(Book), limit, cursor, sort, order, fields)
+            if await self._may_fill_cache(versions):
+                await book_cache.set_page(versions, "all", *params, page=page)
+        return page
+
+    async def _get_books_page(self, stmt, limit: int, cursor: Optional[str],
+                              sort: str, order: str, fields: Optional[Sequence[str]] = None) -> Page[Book]:
+        """ソートキーの続きから limit 件取得する
+
+        Raises:
+            ValueError: ソートキーやカーソル、列名が不正な場合
+        """
+        columns = BOOK_SORT_KEYS.get(sort)
+        if columns is None:
+            raise ValueError(f"ソートキー '{sort}' は使えません")
+        option = load_book_columns(fields)
+        if option is not None:
+            stmt = stmt.options(option)
+        cursor_sort = f"{sort}:{order}"
+        after = decode_cursor(cursor, cursor_sort)
+        stmt = apply_keyset(stmt, columns, after, limit, descending=(order == "desc"))
+        result = await self.db.execute(stmt)
+        books = result.scalars().all()
+        return make_page(books, limit, cursor_sort, lambda book: [getattr(book, c.key) for c in columns])
+
+    # UPDATE - 本を更新
+    async def update_book(self, book_id: int, **kwargs) -> Optional[Book]:
+        """本の情報を更新"""
+        book = await self._load_book(book_id)
+        if not book:
+            return None
+        old_isbn = book.isbn
+        before = book_stats.facet_values(book)
+
+        # 渡された項目のみ更新
+        for key, value in kwargs.items():
+            if hasattr(book, key):
+                setattr(book, key, value)
+
+        await self.db.commit()
+        await self.db.refresh(book)
+        await book_cache.invalidate([book_id], [old_isbn, book.isbn])
+        book_stats.updated(before, book)
+        publish_updated(book, [key for key in kwargs if hasattr(book, key)])
+        return book
+
+    # DELETE - 本を削除
+    async def delete_book(self, book_id: int) -> bool:
+        """本を削除"""
+        book = await self._load_book(book_id)
+        if not book:
+            return False
+
+        await self.db.delete(book)
+        await self.db.commit()
+        await book_cache.invalidate([book_id], [book.isbn])
+        book_stats.deleted(book)
+        publish_deleted(book_id)
+        return True
+
+    # その他の便利メソッド
+    async def search_books(self, query: str, limit: int = 20, cursor: Optional[str] = None,
+                           fields: Optional[Sequence[str]] = None, author: Optional[str] = None,
+                           published_year: Optional[int] = None) -> Page[SearchHit]:
+        """タイトル・著者・説明で本を検索（関連度順、ハイライト付き。著者・出版年のファセットで絞り込める）"""
+        engine = BookSearchEngine(self.db.get_bind().dialect.name)
+        after = decode_cursor(cursor, "search")
+        filters = []
+        if author is not None:
+            filters.append(Book.author == author)
+        if published_year is not None:
+            filters.append(Book.published_year == published_year)
+        result = await self.db.execute(engine.build_query(query, limit, after, fields, filters))
+        hits = engine.to_hits(result.all(), query)
+        return make_page(hits, limit, "search", lambda hit: [hit.rank, hit.book.id])
+
+    async def get_available_books(self) -> List[Book]:
+        """利用可能な本のみ取得"""
+        result = await self.db.execute(select(Book).where(Book.is_available == True))
+        return list(result.scalars().all())
+
+    # 貸し出し・返却機能
+    async def borrow_book(self, book_id: int, user_id: Optional[int] = None) -> Optional[Book]:
+        """
+        本を貸し出し（1週間）。貸出履歴も同じトランザクションで追加する
+
+        Returns:
+            Book: 貸し出した本、本が存在しない場合はNone
+
+        Raises:
+            BookNotAvailableError: 既に貸し出し中の場合
+        """
+        result = await self.db.execute(_borrow_statement(book_id))
+        book = result.scalars().first()
+        if book is not None:
+            await self.db.execute(_open_loans_statement([book], user_id))
+        await self.db.commit()
+        if book is None:
+            # 更新できなかった場合だけ、存在しないのか貸出中なのかを確認する
+            if await self.db.scalar(select(Book.id).where(Book.id == book_id)) is None:
+                return None
+            raise BookNotAvailableError("この本は貸し出し中です")
+        await book_cache.invalidate([book_id], [book.isbn])
+        book_stats.borrowed()
+        publish_borrowed(book)
+        return book
+
+    async def return_book(self, book_id: int) -> Optional[Book]:
+        """
+        本を返却
+
+        Returns:
+            Book: 返却された本、本が存在しない場合はNone
+
+        Raises:
+            BookNotBorrowedError: 貸し出されていない場合
+        """
+        result = await self.db.execute(_return_statement(book_id))
+        book = result.scalars().first()
+        if book is not None:
+            await self.db.execute(_close_loans_statement([book]))
+        await self.db.commit()
+        if book is None:
+            if await self.db.scalar(select(Book.id).where(Book.id == book_id)) is None:
+                return None
+            raise BookNotBorrowedError("この本は貸し出されていません")
+        await book_cache.invalidate([book_id], [book.isbn])
+        book_stats.returned()
+        publish_returned(book)
+        return book
+
+    async def borrow_books(self, book_ids: Iterable[int], mode: str = "atomic",
+                           user_id: Optional[int] = None) -> LoanBatchReport:
+        """
+        複数の本をまとめて貸し出し（1つの UPDATE、1つのトランザクション）
+
+        全て貸し出せた場合は UPDATE ... RETURNING、貸出履歴の INSERT、コミットの3往復。できなかった本があれば、
+        存在するかの確認に1往復増える。atomic では1冊でもできなければ全て取り消す。
+
+        Raises:
+            ValueError: モードが不正な場合、冊数が0または多すぎる場合
+        """
+        report = await self._update_loans(_loan_ids(book_ids, mode), mode, _borrow_statement, "borrowed", "unavailable",
+                                          lambda books: _open_loans_statement(books, user_id))
+        book_stats.borrowed(len(report.books))
+        for book in report.books:
+            publish_borrowed(book)
+        return report
+
+    async def return_books(self, book_ids: Iterable[int], mode: str = "atomic") -> LoanBatchReport:
+        """
+        複数の本をまとめて返却（1つの UPDATE、1つのトランザクション）
+
+        Raises:
+            ValueError: モードが不正な場合、冊数が0または多すぎる場合
+        """
+        report = await self._update_loans(_loan_ids(book_ids, mode), mode, _return_statement, "returned", "not_borrowed",
+                                          _close_loans_statement)
+        book_stats.returned(len(report.books))
+        for book in report.books:
+            publish_returned(book)
+        return report
+
+    async def _update_loans(self, ids: List[int], mode: str, statement, done: str, conflict: str,
+                            history) -> LoanBatchReport:
+        result = await self.db.execute(statement(*ids))
+        updated = {book.id: book for book in result.scalars()}
+        existing = set()
+        if len(updated) < len(ids):
+            # 更新できなかった本だけ、存在するかを確認する
+            failed = [book_id for book_id in ids if book_id not in updated]
+            existing = set(await self.db.scalars(select(Book.id).where(Book.id.in_(failed))))
+        report = _loan_report(ids, mode, updated, existing, done, conflict)
+        if report.committed:
+            if report.books:
+                await self.db.execute(history(report.books))
+            await self.db.commit()
+            if report.books:
+                await book_cache.invalidate([book.id for book in report.books], [book.isbn for book in report.books])
+        else:
+            await self.db.rollback()
+        return report
+
+    async def get_borrowed_books(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                                 sort: str = "id", order: str = "asc",
+                                 fields: Optional[Sequence[str]] = None) -> Page[Book]:
+        """貸出中の本一覧を取得（キーセット方式のページング、キャッシュ優先）"""
+        versions = await book_cache.versions()
+        params = (limit, cursor, sort, order, _fields_key(fields))
+        page = await book_cache.get_page(versions, "borrowed", *params)
+        if page is None:
+            stmt = select(Book).where(Book.is_available == False)
+            page = await self._get_books_page(stmt, limit, cursor, sort, order, fields)
+            if await self._may_fill_cache(versions):
+                await book_cache.set_page(versions, "borrowed", *params, page=page)
+        return page
+
+    async def get_overdue_books(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                                fields: Optional[Sequence[str]] = None,
+                                now: Optional[datetime] = None) -> Page[Book]:
+        """
+        返却期限を過ぎた貸出中の本（期限の古い順、キーセット方式のページング）
+
+        貸出中の本だけの部分インデックス ix_books_overdue を期限の順に読むので、
+        延滞していない本や貸出中でない本は読まない。
+
+        Raises:
+            ValueError: カーソルや列名が不正な場合
+        """
+        stmt = select(Book).where(Book.is_available == False, Book.borrowed_until < (now or datetime.now()))
+        option = load_book_columns(fields)
+        if option is not None:
+            stmt = stmt.options(option)
+        stmt = apply_keyset(stmt, (Book.borrowed_until, Book.id), decode_time_cursor(cursor, OVERDUE_SORT), limit)
+        books = (await self.db.execute(stmt)).scalars().all()
+        return make_page(books, limit, OVERDUE_SORT, _overdue_key)
+
+    async def mark_overdue(self, books: Sequence[Book]) -> List[int]:
+        """
+        延滞中の本の貸出履歴に延滞の印（overdue_at）を付け、overdue イベントを流す
+
+        既に印の付いた貸出は対象外なので、同じ本を何度渡してもイベントは1回だけ。
+
+        Returns:
+            新たに延滞として処理した本のID
+        """
+        if not books:
+            return []
+        result = await self.db.execute(
+            update(Loan)
+            .where(Loan.book_id.in_([book.id for book in books]), OPEN_LOAN_CONDITION, Loan.overdue_at.is_(None))
+            .values(overdue_at=datetime.now())
+            .returning(Loan.book_id)
+            .execution_options(synchronize_session=False)
+        )
+        marked = set(result.scalars())
+        await self.db.commit()
+        for book in books:
+            if book.id in marked:
+                publish_overdue(book)
+        return [book.id for book in books if book.id in marked]
+
+    def export_books(self, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+        """全ての本をNDJSON/CSVのバイト列として少しずつ返す（サーバーサイドカーソル使用）"""
+        return iter_export(self.db, fmt, batch_size)
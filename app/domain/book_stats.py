@@ -0,0 +1,229 @@
+# app/domain/book_stats.py
+"""
+本の統計（総数・貸出可能・貸出中の冊数）とファセット（著者別・出版年別の冊数）
+
+BookService / AsyncBookService の書き込みのたびにプロセス内のカウンターを増減させ、
+/api/books/stats と /api/books/facets はカウンターを返すだけにする（DBには問い合わせない）。
+
+- STATS_RECONCILE_INTERVAL 秒ごとにDBの COUNT / GROUP BY と突き合わせて置き換える。
+  他のワーカーでの書き込みによるずれは、ここで直る（それまでは古い値が見えうる）
+- 突き合わせの集計は1つのスナップショットで読む（PostgreSQLは REPEATABLE READ、SQLiteは読み取りの
+  トランザクションがもともとスナップショット）。スナップショットを取った後の書き込みの増減は控えておき、
+  集計の結果に足してから置き換える。コミットからカウンターに反映するまでの間にスナップショットを
+  取った書き込みは、二重に数えるか数え漏れることがある（次の突き合わせで直る）
+- 一括取り込みなど増減を特定できない書き込みの後と、起動直後は、次に読むときに突き合わせる
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, select, text
+
+from infrastructure.db import async_session_scope
+
+from .book import Book
+
+logger = logging.getLogger("booklog.stats")
+
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "300"))
+
+# ファセットにする列
+FACET_NAMES = ("author", "published_year")
+
+# (カウンターの名前, 値, 増減)。総数は ("total", None)、著者別は ("author", 著者名) のように数える
+Delta = Tuple[str, Any, int]
+
+
+class BookStats:
+    """本の統計とファセットのカウンター"""
+
+    def __init__(self, reconcile_interval: float = STATS_RECONCILE_INTERVAL):
+        self.reconcile_interval = reconcile_interval
+        self._counter: Counter = Counter()
+        self._lock = threading.Lock()
+        # 突き合わせ中の増減（突き合わせていないときはNone）
+        self._journal: Optional[List[Delta]] = None
+        # ファセットごとの並べ替え済みの一覧（カウンターが変わったら消す）
+        self._sorted: Dict[str, List[Tuple[Any, int]]] = {}
+        # invalidate の回数と、最後の突き合わせを始めた時点の回数（違えば突き合わせが必要）
+        self._dirty = 0
+        self._reconciled_dirty = -1
+        self._reconcile_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self.reconciled_at: Optional[datetime] = None
+        self.reconcile_seconds: Optional[float] = None
+
+    @property
+    def stale(self) -> bool:
+        return self._reconciled_dirty != self._dirty
+
+    def _apply(self, deltas: Iterable[Delta]) -> None:
+        with self._lock:
+            for name, value, amount in deltas:
+                if amount == 0:
+                    continue
+                self._add(self._counter, name, value, amount)
+                self._sorted.pop(name, None)
+                if self._journal is not None:
+                    self._journal.append((name, value, amount))
+
+    @staticmethod
+    def _add(counter: Counter, name: str, value: Any, amount: int) -> None:
+        key = (name, value)
+        counter[key] += amount
+        if counter[key] == 0:
+            del counter[key]
+
+    # 書き込み側から呼ぶ（コミットの後）
+    @staticmethod
+    def _book_deltas(book: Book, amount: int) -> List[Delta]:
+        return [
+            ("total", None, amount),
+            ("available", None, amount if book.is_available else 0),
+            *((name, getattr(book, name), amount) for name in FACET_NAMES),
+        ]
+
+    def created(self, book: Book) -> None:
+        self._apply(self._book_deltas(book, 1))
+
+    def deleted(self, book: Book) -> None:
+        self._apply(self._book_deltas(book, -1))
+
+    @staticmethod
+    def facet_values(book: Book) -> Dict[str, Any]:
+        """更新前のファセットの値（updated に渡す）"""
+        return {name: getattr(book, name) for name in FACET_NAMES}
+
+    def updated(self, before: Dict[str, Any], book: Book) -> None:
+        deltas = []
+        for name in FACET_NAMES:
+            after = getattr(book, name)
+            if after != before[name]:
+                deltas += [(name, before[name], -1), (name, after, 1)]
+        self._apply(deltas)
+
+    def borrowed(self, count: int = 1) -> None:
+        self._apply([("available", None, -count)])
+
+    def returned(self, count: int = 1) -> None:
+        self._apply([("available", None, count)])
+
+    def invalidate(self) -> None:
+        """増減を特定できない書き込みの後に呼ぶ（次に読むときに突き合わせる）"""
+        self._dirty += 1
+
+    # 突き合わせ
+    async def reconcile(self, db) -> None:
+        """
+        DBの COUNT / GROUP BY でカウンターを置き換える
+
+        db はトランザクションをまだ始めていないセッションを渡す（最初の文でスナップショットを取る）。
+        """
+        started = time.perf_counter()
+        dirty = self._dirty
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                # READ COMMITTED では文ごとに見える行が変わり、集計の途中の書き込みを二重に数えてしまう
+                await db.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+            counter: Counter = Counter()
+            total, available = (await db.execute(
+                select(func.count(), func.count(case((Book.is_available == True, 1))))
+            )).one()
+            # ここでスナップショットが決まったので、これ以降の増減を控える
+            with self._lock:
+                self._journal = []
+            self._add(counter, "total", None, total)
+            self._add(counter, "available", None, available)
+            for name in FACET_NAMES:
+                column = getattr(Book, name)
+                for value, count in await db.execute(select(column, func.count()).group_by(column)):
+                    self._add(counter, name, value, count)
+        except BaseException:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            for name, value, amount in self._journal:
+                self._add(counter, name, value, amount)
+            self._journal = None
+            self._counter = counter
+            self._sorted.clear()
+        self._reconciled_dirty = dirty
+        self.reconciled_at = datetime.now()
+        self.reconcile_seconds = time.perf_counter() - started
+
+    async def _reconcile_now(self) -> None:
+        if self._reconcile_lock is None:
+            self._reconcile_lock = asyncio.Lock()
+        async with self._reconcile_lock:
+            async with async_session_scope() as db:
+                await self.reconcile(db)
+
+    async def ensure_fresh(self) -> None:
+        """まだ突き合わせていない、または増減を特定できない書き込みがあった場合は突き合わせる"""
+        if self.stale:
+            await self._reconcile_now()
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self._reconcile_now()
+            except Exception:
+                logger.exception("本の統計の突き合わせに失敗しました")
+            await asyncio.sleep(self.reconcile_interval)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # 読み出し
+    def summary(self) -> dict:
+        with self._lock:
+            total = self._counter[("total", None)]
+            available = self._counter[("available", None)]
+            distinct = {name: len(self._sorted_facet(name)) for name in FACET_NAMES}
+        return {
+            "total": total,
+            "available": available,
+            "borrowed": total - available,
+            "authors": distinct["author"],
+            "published_years": distinct["published_year"],
+            "reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None,
+        }
+
+    def _sorted_facet(self, name: str) -> List[Tuple[Any, int]]:
+        # 呼び出し側でロックを持つ
+        values = self._sorted.get(name)
+        if values is None:
+            values = sorted(
+                ((key[1], count) for key, count in self._counter.items() if key[0] == name),
+                key=lambda item: (-item[1], item[0] is None, str(item[0])),
+            )
+            self._sorted[name] = values
+        return values
+
+    def facets(self, names: Iterable[str] = FACET_NAMES, limit: int = 20) -> Dict[str, List[dict]]:
+        """ファセットごとの冊数の多い順の上位 limit 件（変わるまで並べ替えた結果を使い回す）"""
+        with self._lock:
+            return {
+                name: [{"value": value, "count": count} for value, count in self._sorted_facet(name)[:limit]]
+                for name in names
+            }
+
+
+# アプリ全体で共有するインスタンス
+book_stats = BookStats()
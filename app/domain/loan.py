@@ -0,0 +1,118 @@
+# app/domain/loan.py
+"""
+貸出履歴（loans）
+
+貸出のたびに1行追加し、返却で returned_at を入れる（それ以外では延滞の印 overdue_at しか更新しない追記型のテーブル）。
+BookService の貸出・返却と同じトランザクションで書く。
+
+PostgreSQLでは borrowed_at の年ごとのパーティションに分ける（create_loan_table で作成）。
+- 貸出・返却が触るのは未返却の行だけの部分インデックス（ix_loans_open_book）なので、
+  何年分の履歴が溜まっても速さは変わらない
+- 期間を絞った集計はその年のパーティションだけを読む
+- 今年から LOAN_PARTITION_YEARS_AHEAD 年先までのパーティションを作っておく。範囲外の行は
+  loans_default に入る（入っていたらパーティションの作成漏れ）。起動中は OverdueSweeper のリーダーが
+  定期的に ensure_loan_partitions を呼んで、年が進んでも先の年のパーティションを足していく
+SQLiteなどそれ以外のDBでは普通のテーブル（create_all で作る）。
+"""
+import os
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, text
+
+from core.database import Base
+
+LOAN_PARTITION_YEARS_AHEAD = int(os.getenv("LOAN_PARTITION_YEARS_AHEAD", "3"))
+
+# 未返却の貸出だけを対象にする条件（部分インデックスと返却の UPDATE で同じ条件を使う）
+OPEN_LOAN_CONDITION = text("returned_at IS NULL")
+
+
+class Loan(Base):
+    """貸出履歴のモデル"""
+    __tablename__ = "loans"
+    __table_args__ = (
+        # 本ごと・ユーザーごとの履歴（新しい順のキーセット方式のページング用）
+        Index("ix_loans_book_borrowed", "book_id", "borrowed_at", "id"),
+        Index("ix_loans_user_borrowed", "user_id", "borrowed_at", "id"),
+        # 未返却の貸出（返却時に閉じる行を探す）
+        Index("ix_loans_open_book", "book_id",
+              postgresql_where=OPEN_LOAN_CONDITION, sqlite_where=OPEN_LOAN_CONDITION),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    book_id = Column(Integer, nullable=False)       # 本（削除されても履歴は残すので外部キーにしない）
+    user_id = Column(Integer, nullable=True)        # 借りたユーザー（ログインせずに借りた場合はNULL）
+    borrowed_at = Column(DateTime, nullable=False)  # 貸出日時
+    due_at = Column(DateTime, nullable=False)       # 返却期限
+    returned_at = Column(DateTime, nullable=True)   # 返却日時（未返却ならNULL）
+    overdue_at = Column(DateTime, nullable=True)    # 延滞として処理した日時（OverdueSweeper が入れる）
+
+    def __repr__(self):
+        return f"<Loan(id={self.id}, book_id={self.book_id}, user_id={self.user_id})>"
+
+
+# PostgreSQL用のパーティション化したテーブル（主キーにはパーティションキーを含める必要がある）
+LOAN_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS loans (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+    book_id INTEGER NOT NULL,
+    user_id INTEGER,
+    borrowed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    due_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    returned_at TIMESTAMP WITHOUT TIME ZONE,
+    overdue_at TIMESTAMP WITHOUT TIME ZONE,
+    PRIMARY KEY (id, borrowed_at)
+) PARTITION BY RANGE (borrowed_at)
+"""
+
+
+def _partition_ddl(year: int) -> str:
+    return (f"CREATE TABLE IF NOT EXISTS loans_y{year} PARTITION OF loans "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')")
+
+
+def loan_partition_years(now: datetime = None) -> List[int]:
+    """作っておくパーティションの年（今年から LOAN_PARTITION_YEARS_AHEAD 年先まで）"""
+    year = (now or datetime.now()).year
+    return list(range(year, year + LOAN_PARTITION_YEARS_AHEAD + 1))
+
+
+def create_loan_table(bind) -> None:
+    """
+    PostgreSQLでは loans をパーティション化したテーブルとして作成する（それ以外では何もしない）
+
+    create_all より前に呼ぶ（テーブルが既にあれば create_all は作らない）。
+    インデックスは親テーブルに作ると全てのパーティションに作られる。
+    """
+    if bind.dialect.name != "postgresql":
+        return
+    with bind.begin() as conn:
+        conn.execute(text(LOAN_TABLE_DDL))
+        conn.execute(text("CREATE TABLE IF NOT EXISTS loans_default PARTITION OF loans DEFAULT"))
+        for index in Loan.__table__.indexes:
+            index.create(conn, checkfirst=True)
+    ensure_loan_partitions(bind)
+
+
+def ensure_loan_partitions(bind) -> List[str]:
+    """
+    足りない年のパーティションを作成する（PostgreSQL以外では何もしない）
+
+    Returns:
+        作成したパーティションの名前
+    """
+    if bind.dialect.name != "postgresql":
+        return []
+    created = []
+    with bind.begin() as conn:
+        existing = set(conn.scalars(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'loans'::regclass"
+        )))
+        for year in loan_partition_years():
+            name = f"loans_y{year}"
+            if name not in existing:
+                conn.execute(text(_partition_ddl(year)))
+                created.append(name)
+    return created
@@ -0,0 +1,50 @@
+# app/domain/loan_service.py
+"""
+貸出履歴の読み出し（本ごと・ユーザーごと、新しい順）
+
+(borrowed_at, id) のキーセット方式でページングするので、何ページ目でもインデックスを
+範囲で読むだけで済む。PostgreSQLでは各パーティションのインデックスを順にマージする。
+"""
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .loan import Loan
+from .pagination import DEFAULT_PAGE_SIZE, Page, apply_keyset, decode_time_cursor, make_page
+
+# カーソルのソート名（新しい順）
+LOAN_SORT = "borrowed_at:desc"
+
+
+class AsyncLoanService:
+    """貸出履歴の読み出し"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _get_page(self, stmt, limit: int, cursor: Optional[str]) -> Page[Loan]:
+        after = decode_time_cursor(cursor, LOAN_SORT)
+        stmt = apply_keyset(stmt, (Loan.borrowed_at, Loan.id), after, limit, descending=True)
+        rows = (await self.db.scalars(stmt)).all()
+        return make_page(rows, limit, LOAN_SORT, lambda loan: (loan.borrowed_at.isoformat(), loan.id))
+
+    async def get_book_loans(self, book_id: int, limit: int = DEFAULT_PAGE_SIZE,
+                             cursor: Optional[str] = None) -> Page[Loan]:
+        """
+        本の貸出履歴（新しい順）
+
+        Raises:
+            ValueError: カーソルが不正な場合
+        """
+        return await self._get_page(select(Loan).where(Loan.book_id == book_id), limit, cursor)
+
+    async def get_user_loans(self, user_id: int, limit: int = DEFAULT_PAGE_SIZE,
+                             cursor: Optional[str] = None) -> Page[Loan]:
+        """
+        ユーザーの貸出履歴（新しい順）
+
+        Raises:
+            ValueError: カーソルが不正な場合
+        """
+        return await self._get_page(select(Loan).where(Loan.user_id == user_id), limit, cursor)
@@ -0,0 +1,143 @@
+# app/domain/overdue_sweeper.py
+"""
+延滞の定期処理（アプリの lifespan で起動するバックグラウンドタスク）
+
+OVERDUE_SWEEP_INTERVAL 秒ごとに、返却期限を過ぎた貸出中の本を期限の古い順に
+OVERDUE_SWEEP_BATCH 件ずつ読み、貸出履歴に延滞の印を付けて overdue イベントを流す。
+
+- 本は部分インデックス ix_books_overdue を期限の順に読む。処理済みの位置（カーソル）を持っておき、
+  次の回はその続きから読むので、延滞したまま返されない本を毎回読み直さない
+- 1回に読むのは OVERDUE_SWEEP_MAX_BATCHES バッチまで（残りは次の回）
+- 複数ワーカーでは、アドバイザリロックを取れた1つだけが処理する（infrastructure.leader）。
+  リーダーが替わった場合は先頭から読み直すが、印の付いた貸出は対象外なのでイベントは重複しない
+- overdue イベントはリーダーのワーカーのプロセス内のフィード（book_events）にだけ流れる。
+  複数ワーカーでは、他のワーカーで /api/books/events を購読しているクライアントには届かない
+- リーダーは LOAN_PARTITION_CHECK_INTERVAL 秒に1回、貸出履歴の足りない年のパーティションも作成する
+  （ensure_loan_partitions。年が変わっても loans_default に溜まらないようにする）
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from infrastructure.db import async_session_scope, engine
+from infrastructure.leader import AdvisoryLockLeader
+
+from .book_service import AsyncBookService, overdue_cursor_after
+from .loan import ensure_loan_partitions
+
+logger = logging.getLogger("booklog.overdue")
+
+OVERDUE_SWEEP_ENABLED = os.getenv("OVERDUE_SWEEP_ENABLED", "true").lower() in ("1", "true", "yes")
+OVERDUE_SWEEP_INTERVAL = float(os.getenv("OVERDUE_SWEEP_INTERVAL", "60"))
+OVERDUE_SWEEP_BATCH = int(os.getenv("OVERDUE_SWEEP_BATCH", "100"))
+OVERDUE_SWEEP_MAX_BATCHES = int(os.getenv("OVERDUE_SWEEP_MAX_BATCHES", "10"))
+LOAN_PARTITION_CHECK_INTERVAL = float(os.getenv("LOAN_PARTITION_CHECK_INTERVAL", "86400"))
+
+# 処理で読む列（イベントに入れる borrowed_until と、キーの列）
+SWEEP_FIELDS = ("borrowed_until",)
+
+
+class OverdueSweeper:
+    """延滞中の本を定期的に処理する"""
+
+    def __init__(self, leader: AdvisoryLockLeader, interval: float = OVERDUE_SWEEP_INTERVAL,
+                 batch_size: int = OVERDUE_SWEEP_BATCH, max_batches: int = OVERDUE_SWEEP_MAX_BATCHES):
+        self.leader = leader
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self._cursor: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._partitions_checked_at: Optional[float] = None
+        self.runs = 0
+        self.marked = 0
+        self.last_run: Optional[datetime] = None
+
+    async def sweep(self, now: Optional[datetime] = None) -> int:
+        """
+        延滞中の本を最大 max_batches バッチ処理する
+
+        Returns:
+            新たに延滞として処理した本の数
+        """
+        now = now or datetime.now()
+        marked = 0
+        for _ in range(self.max_batches):
+            async with async_session_scope() as db:
+                service = AsyncBookService(db)
+                page = await service.get_overdue_books(limit=self.batch_size, cursor=self._cursor,
+                                                       fields=SWEEP_FIELDS, now=now)
+                marked += len(await service.mark_overdue(page.items))
+            if page.items:
+                self._cursor = overdue_cursor_after(page.items[-1])
+            if page.next_cursor is None:
+                break
+        self.runs += 1
+        self.marked += marked
+        self.last_run = now
+        return marked
+
+    async def ensure_partitions(self) -> List[str]:
+        """
+        貸出履歴の足りないパーティションを作成する（LOAN_PARTITION_CHECK_INTERVAL 秒に1回まで）
+
+        Returns:
+            作成したパーティションの名前
+        """
+        checked_at = time.monotonic()
+        if (self._partitions_checked_at is not None
+                and checked_at - self._partitions_checked_at < LOAN_PARTITION_CHECK_INTERVAL):
+            return []
+        created = await asyncio.to_thread(ensure_loan_partitions, engine)
+        self._partitions_checked_at = checked_at
+        if created:
+            logger.info("貸出履歴のパーティションを作成しました: %s", ", ".join(created))
+        return created
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                if await self.leader.acquire():
+                    try:
+                        await self.ensure_partitions()
+                    except Exception:
+                        logger.exception("貸出履歴のパーティションの作成に失敗しました")
+                    await self.sweep()
+                else:
+                    # 他のワーカーがリーダー。リーダーになったときは先頭から読む
+                    self._cursor = None
+            except Exception:
+                logger.exception("延滞の処理に失敗しました")
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        if not OVERDUE_SWEEP_ENABLED or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.leader.release()
+
+    def status(self) -> dict:
+        return {
+            "enabled": OVERDUE_SWEEP_ENABLED,
+            "running": self._task is not None,
+            "runs": self.runs,
+            "marked": self.marked,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            **self.leader.status(),
+        }
+
+
+# アプリ全体で共有するインスタンス
+overdue_sweeper = OverdueSweeper(AdvisoryLockLeader(engine, "booklog:overdue-sweeper"))
@@ -0,0 +1,95 @@
+# app/domain/pagination.py
+"""
+キーセット（カーソル）方式のページング
+
+OFFSETは読み飛ばす行数に比例して遅くなるため、前ページ最後の行のソートキーを
+カーソルとして渡し、「そのキーより後ろ」をインデックスで直接探す。
+カーソルはクライアントからは中身の見えない文字列として扱う。
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Generic, List, Optional, Sequence, TypeVar
+
+from sqlalchemy import tuple_
+from sqlalchemy.sql import Select
+
+T = TypeVar("T")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+@dataclass
+class Page(Generic[T]):
+    """1ページ分の結果"""
+    items: List[T] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    """ソートキー名と値からカーソル文字列を作る"""
+    payload = json.dumps({"s": sort, "v": list(values)}, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], sort: str) -> Optional[list]:
+    """カーソル文字列を値のリストに戻す
+
+    Raises:
+        ValueError: カーソルが壊れている、または別のソート順で作られたものの場合
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = payload["v"]
+        cursor_sort = payload["s"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("カーソルが不正です")
+    if cursor_sort != sort or not isinstance(values, list):
+        raise ValueError("カーソルとソート順が一致しません")
+    return values
+
+
+def decode_time_cursor(cursor: Optional[str], sort: str) -> Optional[list]:
+    """(日時, id) のカーソルを値のリストに戻す（日時はISO形式の文字列で入れておく）
+
+    Raises:
+        ValueError: カーソルが不正な場合
+    """
+    values = decode_cursor(cursor, sort)
+    if values is None:
+        return None
+    try:
+        moment, row_id = values
+        return [datetime.fromisoformat(moment), int(row_id)]
+    except (TypeError, ValueError):
+        raise ValueError("カーソルが不正です")
+
+
+def apply_keyset(stmt: Select, columns: Sequence, values: Optional[list], limit: int,
+                 descending: bool = False) -> Select:
+    """SELECT文にキーセット条件・並び順・件数制限を付ける
+
+    次ページの有無を判定するため limit + 1 件取得する。
+    """
+    if values is not None:
+        if len(values) != len(columns):
+            raise ValueError("カーソルとソート順が一致しません")
+        key = columns[0] if len(columns) == 1 else tuple_(*columns)
+        bound = values[0] if len(columns) == 1 else tuple_(*values)
+        stmt = stmt.where(key < bound if descending else key > bound)
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def make_page(rows: Sequence[T], limit: int, sort: str, key: Callable[[T], Sequence[Any]]) -> Page[T]:
+    """limit + 1 件取得した結果から Page を作る"""
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit and items:
+        next_cursor = encode_cursor(sort, key(items[-1]))
+    return Page(items=items, next_cursor=next_cursor)
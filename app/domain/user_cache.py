@@ -0,0 +1,51 @@
+# app/domain/user_cache.py
+"""
+認証済みユーザーのキャッシュ（get_current_user 用）
+
+トークンのメールアドレスからユーザーを引く結果を、プロセス内に短いTTLで持つ。
+認証のたびにDBへ問い合わせないためのもので、Redisは使わない（往復の時間がかかるため）。
+UserService / AsyncUserService の更新・無効化で該当ユーザーのエントリを消す。
+別のワーカーで更新された場合は、TTL（USER_CACHE_TTL_SECONDS）が過ぎるまで古い値が残りうる。
+
+パスワードのハッシュはキャッシュしない。返すユーザーは読み取り専用として扱うこと。
+"""
+import os
+from typing import Iterable, Optional
+
+from infrastructure.cache import MemoryCache
+
+from .user import User
+
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+# キャッシュする列
+CACHED_COLUMNS = ("id", "email", "name")
+
+
+class UserCache:
+    """メールアドレスをキーにしたユーザーのキャッシュ"""
+
+    def __init__(self, backend: MemoryCache):
+        self.backend = backend
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return f"users:email:{email}"
+
+    def get(self, email: str) -> Optional[User]:
+        row = self.backend.get(self._key(email))
+        return User(**row) if row is not None else None
+
+    def set(self, user: User) -> None:
+        self.backend.set(self._key(user.email), {name: getattr(user, name) for name in CACHED_COLUMNS})
+
+    def invalidate(self, emails: Iterable[Optional[str]]) -> None:
+        self.backend.delete(*(self._key(email) for email in emails if email))
+
+    def stats(self) -> dict:
+        return self.backend.info()
+
+
+# アプリ全体で共有するインスタンス
+user_cache = UserCache(MemoryCache(max_entries=USER_CACHE_MAX_ENTRIES, default_ttl=USER_CACHE_TTL_SECONDS))
@@ -1,8 +1,13 @@
 # app/domain/user_service.py
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from domain.user import User
-from core.auth import get_password_hash, verify_password
+from domain.user_cache import user_cache
+from core.auth import get_password_hash, verify_dummy_password, verify_password
+from core.password_hasher import password_hasher
+from domain.pagination import DEFAULT_PAGE_SIZE, Page, apply_keyset, decode_cursor, make_page
 from typing import Optional
 
 class UserService:
@@ -69,6 +74,8 @@ class UserService:
         """
         user = self.get_user_by_email(email)
         if not user:
+            # 応答時間でユーザーの有無が分からないよう、いない場合もハッシュを検証する
+            verify_dummy_password(password)
             return None
         if not verify_password(password, user.hashed_password):
             return None
@@ -79,6 +86,7 @@ class UserService:
         user = self.get_user_by_id(user_id)
         if not user:
             return None
+        old_email = user.email
         
         for key, value in kwargs.items():
             if hasattr(user, key):
@@ -91,6 +99,7 @@ class UserService:
         try:
             self.db.commit()
             self.db.refresh(user)
+            user_cache.invalidate([old_email, user.email])
             return user
         except IntegrityError:
             self.db.rollback()
@@ -104,8 +113,106 @@ class UserService:
         
         user.is_active = False
         self.db.commit()
+        user_cache.invalidate([user.email])
         return True
     
-    def get_all_users(self, skip: int = 0, limit: int = 100) -> list[User]:
-        """全ユーザーを取得（ページネーション対応）"""
-        return self.db.query(User).offset(skip).limit(limit).all()
+    def get_all_users(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page[User]:
+        """全ユーザーを取得（キーセット方式のページネーション）"""
+        stmt = apply_keyset(select(User), (User.id,), decode_cursor(cursor, "id"), limit)
+        users = self.db.execute(stmt).scalars().all()
+        return make_page(users, limit, "id", lambda user: [user.id])
+
+
+class AsyncUserService:
+    """UserServiceの非同期版（AsyncSessionを利用し、イベントループをブロックしない）"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_user(self, email: str, name: str, password: str) -> User:
+        """
+        新しいユーザーを作成する
+
+        Raises:
+            ValueError: メールアドレスが既に存在する場合
+            PasswordHasherBusyError: パスワード処理が混み合っている場合
+        """
+        # bcryptはプロセスプールで実行（イベントループをブロックしない）
+        hashed_password = await password_hasher.hash(password)
+
+        new_user = User(
+            email=email,
+            name=name,
+            hashed_password=hashed_password
+        )
+
+        try:
+            self.db.add(new_user)
+            await self.db.commit()
+            await self.db.refresh(new_user)
+            return new_user
+        except IntegrityError as e:
+            await self.db.rollback()
+            if "email" in str(e.orig):
+                raise ValueError(f"メールアドレス '{email}' は既に使用されています")
+            else:
+                raise ValueError("ユーザーの作成に失敗しました")
+
+    async def get_user_by_email(self, email: str) -> Optional[User]:
+        """メールアドレスでユーザーを取得"""
+        result = await self.db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
+
+    async def get_user_by_id(self, user_id: int) -> Optional[User]:
+        """IDでユーザーを取得"""
+        result = await self.db.execute(select(User).where(User.id == user_id))
+        return result.scalars().first()
+
+    async def get_user_for_auth(self, email: str) -> Optional[User]:
+        """認証済みリクエストのユーザーを取得（キャッシュ優先。パスワードのハッシュは含まない読み取り専用）"""
+        user = user_cache.get(email)
+        if user is None:
+            user = await self.get_user_by_email(email)
+            if user is not None:
+                user_cache.set(user)
+        return user
+
+    async def authenticate_user(self, email: str, password: str) -> Optional[User]:
+        """ユーザー認証（成功時はユーザー、失敗時はNone）"""
+        user = await self.get_user_by_email(email)
+        if not user:
+            # 応答時間でユーザーの有無が分からないよう、いない場合もハッシュを検証する
+            await password_hasher.verify_dummy(password)
+            return None
+        if not await password_hasher.verify(password, user.hashed_password):
+            return None
+        return user
+
+    async def update_user(self, user_id: int, **kwargs) -> Optional[User]:
+        """ユーザー情報を更新"""
+        user = await self.get_user_by_id(user_id)
+        if not user:
+            return None
+        old_email = user.email
+
+        for key, value in kwargs.items():
+            if key == 'password':
+                # パスワードの場合はハッシュ化
+                user.hashed_password = await password_hasher.hash(value)
+            elif hasattr(user, key):
+                setattr(user, key, value)
+
+        try:
+            await self.db.commit()
+            await self.db.refresh(user)
+            user_cache.invalidate([old_email, user.email])
+            return user
+        except IntegrityError:
+            await self.db.rollback()
+            return None
+
+    async def get_all_users(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page[User]:
+        """全ユーザーを取得（キーセット方式のページネーション）"""
+        stmt = apply_keyset(select(User), (User.id,), decode_cursor(cursor, "id"), limit)
+        result = await self.db.execute(stmt)
+        return make_page(result.scalars().all(), limit, "id", lambda user: [user.id])
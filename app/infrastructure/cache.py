@@ -0,0 +1,214 @@
+# app/infrastructure/cache.py
+"""
+キャッシュのバックエンド
+
+- MemoryCache: プロセス内のLRU + TTL（ワーカーごとに独立）
+- RedisCache:  Redisを使った共有キャッシュ（複数ワーカーで無効化を共有できる。extras の redis が必要）
+
+どちらも同じメソッドを持ち、async版（a〜）も用意している。値はJSONにできるものに限る。
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class RedisNotInstalledError(RuntimeError):
+    """Redisのバックエンドが設定されているが redis パッケージが入っていない"""
+
+
+def import_redis(setting: str):
+    """
+    redis パッケージを読み込む（extras の redis で入る）
+
+    Raises:
+        RedisNotInstalledError: redis パッケージが入っていない場合
+    """
+    try:
+        import redis
+        import redis.asyncio
+    except ImportError as e:
+        raise RedisNotInstalledError(
+            f"{setting} には redis パッケージが必要です"
+            "（uv sync --extra redis または pip install 'my-aws-project[redis]' でインストールしてください）"
+        ) from e
+    return redis
+
+
+class CacheStats:
+    """ヒット・ミス・追い出しの回数"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.deletes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+
+class MemoryCache:
+    """プロセス内のLRUキャッシュ（エントリごとにTTL付き）"""
+
+    def __init__(self, max_entries: int = 10000, default_ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # incr のカウンタ（世代など）。LRUから追い出されると古いキーのエントリが読めてしまうので別に持つ
+        self._counters: Dict[str, int] = {}
+        # 同期セッションのフォールバックではスレッドから呼ばれるためロックする
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def get_counters(self, keys: List[str]) -> List[int]:
+        """incr で作ったカウンタを読む（ヒット・ミスには数えない）"""
+        with self._lock:
+            return [self._counters.get(key, 0) for key in keys]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            self.stats.sets += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.stats.deletes += 1
+
+    def incr(self, key: str) -> int:
+        """カウンタを1増やす（TTLなし、追い出されない）"""
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def clear(self) -> None:
+        # カウンタは戻さない（戻すと古い世代のキーと同じキーを作りうる）
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": "memory", "entries": len(self._entries), "counters": dict(self._counters),
+                "max_entries": self.max_entries, **self.stats.to_dict()}
+
+    # async版（プロセス内なのでそのまま呼ぶ）
+    async def aget(self, key: str) -> Any:
+        return self.get(key)
+
+    async def aget_counters(self, keys: List[str]) -> List[int]:
+        return self.get_counters(keys)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set(key, value, ttl)
+
+    async def adelete(self, *keys: str) -> None:
+        self.delete(*keys)
+
+    async def aincr(self, key: str) -> int:
+        return self.incr(key)
+
+
+class RedisCache:
+    """Redisを使った共有キャッシュ（値はJSONで保存）"""
+
+    def __init__(self, url: str, default_ttl: float = 60.0, prefix: str = "booklog:"):
+        redis = import_redis("CACHE_BACKEND=redis")
+
+        self.url = url
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._async_client = redis.asyncio.Redis.from_url(url)
+        self.stats = CacheStats()
+
+    def _decode(self, raw) -> Any:
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return json.loads(raw)
+
+    def _ttl(self, ttl: Optional[float]) -> Optional[int]:
+        ttl = self.default_ttl if ttl is None else ttl
+        return max(1, int(ttl)) if ttl else None
+
+    def get(self, key: str) -> Any:
+        return self._decode(self._client.get(self.prefix + key))
+
+    def get_counters(self, keys: List[str]) -> List[int]:
+        return [int(raw or 0) for raw in self._client.mget([self.prefix + k for k in keys])]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._client.set(self.prefix + key, json.dumps(value), ex=self._ttl(ttl))
+        self.stats.sets += 1
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.stats.deletes += self._client.delete(*[self.prefix + k for k in keys])
+
+    def incr(self, key: str) -> int:
+        return self._client.incr(self.prefix + key)
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self.prefix + "*"):
+            self._client.delete(key)
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": "redis", "url": self.url, **self.stats.to_dict()}
+
+    async def aget(self, key: str) -> Any:
+        return self._decode(await self._async_client.get(self.prefix + key))
+
+    async def aget_counters(self, keys: List[str]) -> List[int]:
+        raws = await self._async_client.mget([self.prefix + k for k in keys])
+        return [int(raw or 0) for raw in raws]
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self._async_client.set(self.prefix + key, json.dumps(value), ex=self._ttl(ttl))
+        self.stats.sets += 1
+
+    async def adelete(self, *keys: str) -> None:
+        if keys:
+            self.stats.deletes += await self._async_client.delete(*[self.prefix + k for k in keys])
+
+    async def aincr(self, key: str) -> int:
+        return await self._async_client.incr(self.prefix + key)
+
+
+def create_cache_from_env():
+    """環境変数からキャッシュを作成（CACHE_BACKEND=memory|redis|none）"""
+    backend = os.getenv("CACHE_BACKEND", "memory")
+    ttl = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+    if backend == "none":
+        return None
+    if backend == "redis":
+        return RedisCache(os.getenv("REDIS_URL", "redis://localhost:6379/0"), default_ttl=ttl)
+    return MemoryCache(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")), default_ttl=ttl)
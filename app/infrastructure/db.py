@@ -1,10 +1,21 @@
-from sqlalchemy import create_engine
+import asyncio
+import importlib
+import logging
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
 from dotenv import load_dotenv
+from infrastructure.query_stats import install_query_hooks
 
 load_dotenv()
 
+logger = logging.getLogger("booklog.db")
+
 # Docker環境でのデータベース接続設定
 # コンテナ間通信では、PostgreSQLコンテナのサービス名（db）とコンテナ内ポート（5432）を使用
 DB_HOST = os.getenv('DB_HOST', 'db')  # Docker環境ではサービス名'db'を使用
@@ -13,18 +24,354 @@ DB_USER = os.getenv('DB_USER', 'appuser')
 DB_PASSWORD = os.getenv('DB_PASSWORD')
 DB_NAME = os.getenv('DB_NAME', 'booklog')
 
-# 接続URLを組み立てる
-DB_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# 接続URL（DATABASE_URL があればそれを使い、無ければ上の設定からPostgreSQLのURLを組み立てる）
+# SQLiteの例: sqlite:///./booklog.db（ファイル）、sqlite:///:memory:（メモリ）
+DATABASE_URL = os.getenv('DATABASE_URL') or f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+db_url = make_url(DATABASE_URL)
+IS_SQLITE = db_url.get_backend_name() == "sqlite"
+IS_SQLITE_MEMORY = IS_SQLITE and (db_url.database in (None, "", ":memory:") or db_url.query.get("mode") == "memory")
+
+if IS_SQLITE_MEMORY:
+    # メモリDBは接続ごとに別物になるため、共有キャッシュの名前付きメモリDBにして
+    # プールの全接続（同期・非同期の両方のエンジン）から同じDBが見えるようにする
+    SQLITE_MEMORY_URI = "file:booklog?mode=memory&cache=shared"
+    db_url = make_url("sqlite:///" + SQLITE_MEMORY_URI + "&uri=true")
+    # 接続が1つも無くなるとメモリDBが消えるので、プロセスが終わるまで1本保持する
+    _sqlite_memory_keeper = sqlite3.connect(SQLITE_MEMORY_URI, uri=True, check_same_thread=False)
+
+print(f" データベース接続URL: {db_url.render_as_string(hide_password=True)}")
+
+# SQLのログ出力（同期でstdoutに書くため本番では無効。クエリの集計は query_stats で行う）
+SQL_ECHO = os.getenv('SQL_ECHO', 'false').lower() in ('1', 'true', 'yes')
+
+# SQLiteの接続ごとの設定（WALで読み込みと書き込みを並行させ、ロック待ちはエラーにせず待つ）
+SQLITE_FILE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",      # WALではNORMALでもDBは壊れない（直近のコミットが失われうるだけ）
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",       # 64MB
+    "PRAGMA mmap_size=268435456",     # 256MB
+)
+SQLITE_MEMORY_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA read_uncommitted=ON",     # 共有キャッシュで読み込みが書き込みのテーブルロックを待たないようにする
+)
+
+def _configure_sqlite(engine) -> None:
+    """SQLiteの接続にPRAGMAを設定し、トランザクションをSQLAlchemy側で開始する"""
+    pragmas = SQLITE_MEMORY_PRAGMAS if IS_SQLITE_MEMORY else SQLITE_FILE_PRAGMAS
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # ドライバの自動BEGINを無効にする（SAVEPOINTが正しく動くようにするため）
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
 
-print(f" データベース接続URL: postgresql://{DB_USER}:***@{DB_HOST}:{DB_PORT}/{DB_NAME}")
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
 
-engine = create_engine(DB_URL, echo=True)
+# コネクションプールの設定（エンジンごと。ワーカー数 ×（POOL_SIZE + MAX_OVERFLOW）がDBの max_connections に収まるようにする）
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))        # 空き接続を待つ秒数
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))        # この秒数より古い接続は作り直す（-1で無効）
+DB_POOL_PRE_PING = _env_bool('DB_POOL_PRE_PING', True)              # 貸し出し前に切れた接続を検出する
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000'))  # PostgreSQLのみ（0で無効）
+DB_POOL_WARMUP = int(os.getenv('DB_POOL_WARMUP', str(DB_POOL_SIZE)))  # 起動時に開いておく接続数
+
+def _engine_options(is_async: bool = False) -> dict:
+    options = dict(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    if IS_SQLITE_MEMORY:
+        # 共有キャッシュのメモリDBはテーブル単位でロックし、ロック待ちもできない（busy_timeoutが効かない）ため、
+        # エンジンごとに1接続のプールにしてトランザクションを順番に実行する（テスト・ベンチマーク用）
+        options.update(poolclass=AsyncAdaptedQueuePool if is_async else QueuePool, pool_size=1, max_overflow=0)
+    if IS_SQLITE:
+        # 同期セッションはスレッドプール（asyncio.to_thread）から使うため
+        if not is_async:
+            options["connect_args"] = {"check_same_thread": False}
+    elif DB_STATEMENT_TIMEOUT_MS > 0:
+        # 長すぎるクエリで接続を占有し続けないよう、サーバー側で打ち切る
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+engine = create_engine(db_url, echo=SQL_ECHO, **_engine_options())
+if IS_SQLITE:
+    _configure_sqlite(engine)
+install_query_hooks(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 非同期エンジン（PostgreSQLはasyncpg、SQLiteはaiosqlite。ドライバが入っていない環境では同期セッションにフォールバック）
+ASYNC_DRIVER, ASYNC_DRIVERNAME = ("aiosqlite", "sqlite+aiosqlite") if IS_SQLITE else ("asyncpg", "postgresql+asyncpg")
+ASYNC_DB_URL = db_url.set(drivername=ASYNC_DRIVERNAME)
+try:
+    importlib.import_module(ASYNC_DRIVER)
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(ASYNC_DB_URL, echo=SQL_ECHO, **_engine_options(is_async=True))
+    if IS_SQLITE:
+        _configure_sqlite(async_engine.sync_engine)
+    install_query_hooks(async_engine.sync_engine)
+    # commit後に属性を再読込するとイベントループ外のIOが必要になるため expire_on_commit=False
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+except ImportError:
+    logger.warning("非同期ドライバ %s が見つかりません。非同期のエンドポイントは同期セッションで動きます", ASYNC_DRIVER)
+    async_engine = None
+    AsyncSessionLocal = None
+
+
+class SyncSessionAdapter:
+    """同期SessionをAsyncSessionと同じ呼び出し方で使うためのラッパー
+
+    DB操作はスレッドプールで実行するので、イベントループはブロックされない。
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    @property
+    def info(self) -> dict:
+        return self.sync_session.info
+
+    def get_bind(self):
+        return self.sync_session.get_bind()
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await asyncio.to_thread(fn, self.sync_session, *args, **kwargs)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await asyncio.to_thread(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def stream(self, statement, *args, **kwargs):
+        statement = statement.execution_options(stream_results=True)
+        result = await asyncio.to_thread(self.sync_session.execute, statement, *args, **kwargs)
+        return SyncStreamResultAdapter(result)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await asyncio.to_thread(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await asyncio.to_thread(self.sync_session.scalars, statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await asyncio.to_thread(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        await asyncio.to_thread(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await asyncio.to_thread(self.sync_session.flush)
+
+    async def refresh(self, instance):
+        await asyncio.to_thread(self.sync_session.refresh, instance)
+
+    async def commit(self):
+        await asyncio.to_thread(self.sync_session.commit)
+
+    async def rollback(self):
+        await asyncio.to_thread(self.sync_session.rollback)
+
+    async def close(self):
+        await asyncio.to_thread(self.sync_session.close)
+
+
+class SyncStreamResultAdapter:
+    """サーバーサイドカーソルの結果を AsyncResult.partitions() と同じ形で読むラッパー"""
+
+    def __init__(self, result):
+        self.result = result
+
+    async def partitions(self, size=None):
+        try:
+            while True:
+                rows = await asyncio.to_thread(self.result.fetchmany, size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            self.result.close()
+
+
+# レプリカのセッションの info に入れるキー（レプリカの名前）。遅れているかもしれない結果の扱いを変えるために使う
+REPLICA_SESSION_INFO = "replica"
+
+
+def is_replica_session(db) -> bool:
+    """読み取りレプリカのセッションか"""
+    return bool(db.info.get(REPLICA_SESSION_INFO))
+
+
+def create_replica_engine(url: str):
+    """プライマリと同じ設定で別のDB（読み取りレプリカ）に接続する
+
+    Returns:
+        (エンジン, セッションを作る関数)。非同期ドライバがあれば AsyncEngine と AsyncSession、
+        無ければ Engine と SyncSessionAdapter になる（get_async_db と同じ呼び出し方で使える）
+    """
+    url = make_url(url)
+    info = {REPLICA_SESSION_INFO: url.render_as_string(hide_password=True)}
+    if async_engine is not None:
+        replica = create_async_engine(url.set(drivername=ASYNC_DRIVERNAME), echo=SQL_ECHO, **_engine_options(is_async=True))
+        sync_engine = replica.sync_engine
+        session_factory = async_sessionmaker(replica, autoflush=False, expire_on_commit=False, info=info)
+    else:
+        replica = sync_engine = create_engine(url, echo=SQL_ECHO, **_engine_options())
+        sync_factory = sessionmaker(autocommit=False, autoflush=False, bind=replica, info=info)
+        session_factory = lambda: SyncSessionAdapter(sync_factory(expire_on_commit=False))
+    if IS_SQLITE:
+        _configure_sqlite(sync_engine)
+    install_query_hooks(sync_engine)
+    return replica, session_factory
+
+
+def engine_pool_status(target) -> dict:
+    """エンジンのコネクションプールの状態（QueuePool以外では取れる値だけ返す）"""
+    pool = getattr(target, "sync_engine", target).pool
+    status = {
+        key: getattr(pool, key)()
+        for key in ("size", "checkedin", "checkedout", "overflow")
+        if hasattr(pool, key)
+    }
+    if "size" in status:
+        # 同時に貸し出せる接続の上限と、そのうち使用中の割合
+        capacity = status["size"] + max(getattr(pool, "_max_overflow", 0), 0)
+        status["capacity"] = capacity
+        status["saturation"] = round(status["checkedout"] / capacity, 3) if capacity else 0.0
+    return status
+
+
+def pool_status() -> dict:
+    """エンジンごとのコネクションプールの状態"""
+    engines = {"sync": engine}
+    if async_engine is not None:
+        engines["async"] = async_engine
+    return {name: engine_pool_status(target) for name, target in engines.items()}
+
+
+# リクエストの処理に使うエンジンの名前（pool_status のキー）
+PRIMARY_POOL = "async" if async_engine is not None else "sync"
+
+
+async def ping_database(timeout: float) -> float:
+    """SELECT 1 の往復時間（秒）を測る（プールの接続待ちを含む）
+
+    Raises:
+        asyncio.TimeoutError: timeout 秒以内に終わらなかった場合
+        Exception: 接続・実行に失敗した場合
+    """
+    started = time.perf_counter()
+    if async_engine is not None:
+        async def ping():
+            async with async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        await asyncio.wait_for(ping(), timeout)
+    else:
+        def ping():
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        await asyncio.wait_for(asyncio.to_thread(ping), timeout)
+    return time.perf_counter() - started
+
+
+async def warm_up_pool(connections: int = DB_POOL_WARMUP) -> int:
+    """起動時にプールへ接続を作っておき、最初のリクエストが接続の確立を待たないようにする
+
+    同時に connections 本の接続を開いて SELECT 1 を実行し、プールに返す。
+    DBにつながらなくても起動は止めない（/readyz で分かる）。開けた接続数を返す。
+    """
+    capacity = pool_status()[PRIMARY_POOL].get("size", connections)
+    connections = min(connections, capacity)
+    if connections <= 0:
+        return 0
+
+    if async_engine is not None:
+        async def open_connection():
+            conn = await async_engine.connect()
+            try:
+                await conn.execute(text("SELECT 1"))
+            except Exception:
+                await conn.close()
+                raise
+            return conn
+        results = await asyncio.gather(*(open_connection() for _ in range(connections)), return_exceptions=True)
+        opened = [conn for conn in results if not isinstance(conn, BaseException)]
+        errors = [e for e in results if isinstance(e, BaseException)]
+        for conn in opened:
+            await conn.close()
+    else:
+        def open_connections():
+            opened = []
+            try:
+                for _ in range(connections):
+                    conn = engine.connect()
+                    opened.append(conn)
+                    conn.execute(text("SELECT 1"))
+            finally:
+                for conn in opened:
+                    conn.close()
+            return opened
+        try:
+            opened, errors = await asyncio.to_thread(open_connections), []
+        except Exception as e:
+            opened, errors = [], [e]
+
+    if errors:
+        logger.warning("コネクションプールのウォームアップに失敗しました (%d/%d): %s", len(opened), connections, errors[0])
+    else:
+        logger.info("コネクションプールをウォームアップしました (%d接続)", len(opened))
+    return len(opened)
+
+
+async def dispose_engines() -> None:
+    """終了時にプールの接続を閉じる"""
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+
+
 # FastAPI依存注入用
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# FastAPI依存注入用（非同期版）
+async def get_async_db():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SyncSessionAdapter(SessionLocal(expire_on_commit=False))
+        try:
+            yield db
+        finally:
+            await db.close()
+
+# StreamingResponseのように、レスポンス送信中もセッションを使い続ける場合に使う
+async_session_scope = asynccontextmanager(get_async_db)
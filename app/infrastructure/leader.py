@@ -0,0 +1,95 @@
+# app/infrastructure/leader.py
+"""
+複数ワーカーのうち1つだけで動かす処理のためのリーダー選出
+
+PostgreSQLのセッションレベルのアドバイザリロック（pg_try_advisory_lock）を取れたワーカーを
+リーダーにする。ロックを取った接続を開いたままにしておき、ワーカーが落ちて接続が切れると
+ロックも外れて、次に確認した別のワーカーがリーダーになる。
+
+- ロック用の接続は同期エンジンのプールから1本使う（リクエストを処理する非同期のプールは減らない）
+- 接続はAUTOCOMMITにして、トランザクションを開いたまま待たない
+- PostgreSQL以外（SQLite）では複数台で動かさない前提なので、常にリーダーとして扱う
+"""
+import asyncio
+import hashlib
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger("booklog.db")
+
+
+def lock_key(name: str) -> int:
+    """名前から pg_advisory_lock のキー（符号付き64bit整数）を作る"""
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+class AdvisoryLockLeader:
+    """アドバイザリロックによるリーダー選出"""
+
+    def __init__(self, engine, name: str):
+        self.engine = engine
+        self.name = name
+        self.key = lock_key(name)
+        self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    @property
+    def is_leader(self) -> bool:
+        return not self.enabled or self._conn is not None
+
+    def _acquire(self) -> bool:
+        if self._conn is not None:
+            # まだロックを持っているか（接続が生きているか）を確認する
+            try:
+                self._conn.execute(text("SELECT 1"))
+                return True
+            except Exception:
+                logger.warning("リーダーのロック %s の接続が切れました", self.name)
+                self._close()
+        conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = bool(conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}))
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._conn = conn
+        logger.info("リーダーのロック %s を取得しました", self.name)
+        return True
+
+    def _close(self) -> None:
+        try:
+            self._conn.invalidate()
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+    def _release(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+    async def acquire(self) -> bool:
+        """リーダーかどうかを確認し、リーダーがいなければロックを取る（リーダーならTrue）"""
+        if not self.enabled:
+            return True
+        return await asyncio.to_thread(self._acquire)
+
+    async def release(self) -> None:
+        if self.enabled:
+            await asyncio.to_thread(self._release)
+
+    def status(self) -> dict:
+        return {"name": self.name, "backend": "advisory_lock" if self.enabled else "local", "leader": self.is_leader}
@@ -0,0 +1,132 @@
+# app/infrastructure/pubsub.py
+"""
+プロセス内のPub/Sub（変更フィード用）
+
+publish() したイベントに連番（seq）を付け、購読中の全てのキューに配る。直近のイベントは
+リングバッファに残しておき、再接続したクライアントは最後に受け取った seq から続きを受け取れる。
+
+- 連番はプロセスごと。stream_id が変わった（再起動・別ワーカー）場合や、バッファから
+  あふれるほど間が空いた場合は続きを渡せないので、購読側に「取り直し」（gap）を知らせる
+- 受け取りが遅い購読者のキューがあふれた場合も、そのキューを捨てて取り直しを知らせる
+  （publish 側が遅い購読者に引きずられないようにするため）
+- publish はスレッド（同期セッションの処理）からも呼べる
+"""
+import asyncio
+import secrets
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, List, Optional, Set, Tuple
+
+
+@dataclass(frozen=True)
+class Event:
+    seq: int
+    type: str
+    id: Optional[int] = None
+    changes: Optional[dict] = None
+
+    def to_dict(self) -> dict:
+        data = {"seq": self.seq, "type": self.type}
+        if self.id is not None:
+            data["id"] = self.id
+        if self.changes:
+            data["changes"] = self.changes
+        return data
+
+
+class Subscription:
+    """1つの購読（イベントを受け取るキュー）"""
+
+    # キューがあふれたことを知らせる印
+    OVERFLOW = object()
+
+    def __init__(self, hub: "EventHub", loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.hub = hub
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.overflowed = False
+
+    def _deliver(self, item: Any) -> None:
+        # イベントループのスレッドで呼ばれる
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(self.OVERFLOW)
+
+    async def get(self, timeout: float) -> Any:
+        """次のイベント（timeout 秒来なければNone、キューがあふれていれば OVERFLOW）"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    """連番付きイベントの配信と、再接続用の直近イベントのバッファ"""
+
+    def __init__(self, buffer_size: int = 1000, max_queue: int = 1000):
+        self.stream_id = secrets.token_hex(4)
+        self.max_queue = max_queue
+        self._seq = 0
+        self._buffer: Deque[Event] = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def publish(self, type: str, id: Optional[int] = None, changes: Optional[dict] = None) -> Event:
+        """イベントを配る（購読者がいなくてもバッファには残す）"""
+        with self._lock:
+            self._seq += 1
+            event = Event(self._seq, type, id, changes)
+            self._buffer.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # イベントループが終了している購読は捨てる
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, stream_id: Optional[str] = None,
+                  since: Optional[int] = None) -> Tuple[Subscription, List[Event], bool]:
+        """
+        購読を始める
+
+        since（と、その seq を受け取った stream_id）を渡すと、その後のイベントをバッファから返す。
+
+        Returns:
+            (購読, 続きのイベント, gap)。gap が True なら続きを渡せないので、クライアントは一覧を取り直す
+        """
+        subscription = Subscription(self, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            # 登録とバッファの読み出しを同じロックの中で行い、取りこぼしと重複を防ぐ
+            self._subscribers.add(subscription)
+            if since is None:
+                return subscription, [], False
+            if stream_id != self.stream_id or since > self._seq:
+                return subscription, [], True
+            backlog = [event for event in self._buffer if event.seq > since]
+            oldest = self._buffer[0].seq if self._buffer else self._seq + 1
+            gap = since + 1 < oldest
+        return subscription, backlog, gap
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"last_seq": self._seq, "buffered": len(self._buffer), "subscribers": len(self._subscribers)}
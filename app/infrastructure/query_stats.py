@@ -0,0 +1,195 @@
+# app/infrastructure/query_stats.py
+"""
+リクエストごとのSQLの集計（件数・DB時間・遅いクエリ・N+1の疑い）
+
+echo=True の代わりに SQLAlchemy のイベントでクエリを数え、リクエストのコンテキスト
+（contextvars）に記録する。QueryStatsMiddleware がレスポンスに Server-Timing ヘッダーを付け、
+遅いクエリや同じSQLの繰り返し（N+1の疑い）があればログに出す。
+
+設定（環境変数）:
+- SLOW_QUERY_MS:          これ以上かかったクエリを遅いクエリとして記録する（ミリ秒、既定 100）
+- N_PLUS_ONE_THRESHOLD:   1リクエストで同じSQLがこの回数以上実行されたら警告する（既定 10）
+- QUERY_COUNT_WARN:       1リクエストのクエリ数がこれを超えたら警告する（既定 50）
+
+テストやベンチマークでは query_budget() / assert_query_budget() でクエリ数の上限を確認できる。
+"""
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger("booklog.sql")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+QUERY_COUNT_WARN = int(os.getenv("QUERY_COUNT_WARN", "50"))
+
+# 記録する遅いクエリの最大件数（1リクエストあたり）
+MAX_SLOW_QUERIES = 20
+
+# トランザクション制御だけの文（SQLiteで明示的に発行する BEGIN など）はクエリとして数えない
+TRANSACTION_CONTROL = re.compile(r"\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|END)\b", re.IGNORECASE)
+
+
+@dataclass
+class QueryStats:
+    """1リクエスト（または query_budget のブロック）で実行されたクエリの集計"""
+    count: int = 0
+    total_seconds: float = 0.0
+    slow: List[Tuple[float, str]] = field(default_factory=list)
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.statements[statement] += 1
+        if seconds * 1000 >= SLOW_QUERY_MS and len(self.slow) < MAX_SLOW_QUERIES:
+            self.slow.append((seconds, statement))
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_seconds * 1000
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """threshold 回以上繰り返されたSQL（N+1の疑い）"""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_ms:.2f};desc="{self.count} queries"'
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+# 開始時刻は実行ごとのコンテキストに持たせる（接続に持たせると、失敗した文の分がプールの接続に残り続ける）
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _record(statement: str, context) -> None:
+    started = getattr(context, "_query_started", None)
+    stats = _current.get()
+    if started is not None and stats is not None and not TRANSACTION_CONTROL.match(statement):
+        stats.record(statement, time.perf_counter() - started)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record(statement, context)
+
+
+def _handle_error(exception_context) -> None:
+    # 失敗した文（一意制約違反やタイムアウトなど）も実行したクエリとして数える
+    if exception_context.execution_context is not None and exception_context.statement is not None:
+        _record(exception_context.statement, exception_context.execution_context)
+
+
+def install_query_hooks(engine) -> None:
+    """エンジンにクエリ集計用のイベントを登録する（AsyncEngine は sync_engine を渡す）"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """ブロック内で実行されたクエリを集計する"""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """クエリ数が上限を超えた場合のエラー"""
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """
+    ブロック内のクエリ数が max_queries 以下であることを確認する（テスト用）
+
+    Raises:
+        QueryBudgetExceeded: 上限を超えた場合
+    """
+    with track_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(_budget_message(stats.count, max_queries, stats.statements.most_common(5)))
+
+
+_SERVER_TIMING_COUNT = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+def assert_query_budget(response, max_queries: int) -> int:
+    """
+    レスポンスの Server-Timing ヘッダーからクエリ数を読み、上限以下であることを確認する（テスト用）
+
+    TestClient などアプリが別スレッドで動く場合は、こちらでエンドポイントごとの上限を確認する。
+
+    Raises:
+        QueryBudgetExceeded: 上限を超えた場合、またはヘッダーが無い場合
+    """
+    match = _SERVER_TIMING_COUNT.search(response.headers.get("server-timing", ""))
+    if match is None:
+        raise QueryBudgetExceeded("Server-Timing ヘッダーにクエリ数がありません")
+    count = int(match.group(1))
+    if count > max_queries:
+        raise QueryBudgetExceeded(_budget_message(count, max_queries))
+    return count
+
+
+def _budget_message(count: int, max_queries: int, statements=()) -> str:
+    lines = [f"クエリ数 {count} が上限 {max_queries} を超えました"]
+    lines += [f"  {n}回: {sql[:200]}" for sql, n in statements]
+    return "\n".join(lines)
+
+
+class QueryStatsMiddleware:
+    """リクエストごとにクエリを集計し、Server-Timing ヘッダーとログに出すASGIミドルウェア"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    # ヘッダーを送る時点までのクエリを出す（ストリーミング中のクエリは含まない）
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                _log_request(scope, stats)
+
+
+def _log_request(scope, stats: QueryStats) -> None:
+    request = f'{scope["method"]} {scope["path"]}'
+    for seconds, statement in stats.slow:
+        logger.warning("遅いクエリ %.1fms (%s): %s", seconds * 1000, request, statement)
+    for statement, n in stats.repeated():
+        logger.warning("N+1の疑い: 同じSQLが%d回実行されました (%s): %s", n, request, statement)
+    if stats.count > QUERY_COUNT_WARN:
+        logger.warning("クエリが多すぎます: %d件 %.1fms (%s)", stats.count, stats.total_ms, request)
+    else:
+        logger.debug("%d queries %.1fms (%s)", stats.count, stats.total_ms, request)
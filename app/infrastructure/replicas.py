@@ -0,0 +1,201 @@
+# app/infrastructure/replicas.py
+"""
+読み取りレプリカへの振り分け
+
+DATABASE_REPLICA_URLS（カンマ区切り）に読み取り専用のDBを指定すると、読み込みだけのAPI
+（本の一覧・検索・詳細・貸出中一覧・/me）は get_async_read_db でレプリカのセッションを受け取る。
+書き込みは従来どおり get_async_db（プライマリ）を使う。
+
+- 振り分け:   正常なレプリカを順番に使う（ラウンドロビン）。正常なものが無ければプライマリ
+- 死活確認:   REPLICA_CHECK_INTERVAL 秒ごとに SELECT 1 を実行し、失敗したレプリカは外す。
+              リクエスト中に接続エラーが起きた場合もすぐ外し、次の確認で戻す
+- 自分の書き込みを読む: 書き込みに成功したレスポンスに Cookie を付け、
+              REPLICA_STICKY_SECONDS 秒の間はそのクライアントの読み込みをプライマリに送る
+              （レプリカの遅延で、借りた直後の本が「貸出可能」に見えないようにする）
+- キャッシュ:   レプリカから読んだ結果は共有キャッシュに入れない（遅れた結果が全員に見えないようにする）
+
+ローカルでは SQLite のファイルを複数用意して試せる（レプリカ側へのコピーは手動）:
+    DATABASE_URL=sqlite:///./primary.db DATABASE_REPLICA_URLS=sqlite:///./replica1.db,sqlite:///./replica2.db
+"""
+import asyncio
+import inspect
+import itertools
+import logging
+import os
+import time
+from typing import Iterable, List, Optional
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+
+from infrastructure.db import create_replica_engine, engine_pool_status, get_async_db
+
+logger = logging.getLogger("booklog.db")
+
+REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+REPLICA_CHECK_TIMEOUT = float(os.getenv("REPLICA_CHECK_TIMEOUT", "1"))
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+# 最後に書き込んだ時刻から、読み込みをプライマリに送る期限（UNIX時刻）を入れる Cookie
+STICKY_COOKIE = "booklog_primary_until"
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class Replica:
+    """読み取りレプリカ1台"""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = make_url(url).render_as_string(hide_password=True)
+        self.engine, self.session_factory = create_replica_engine(url)
+        self.healthy = True
+        self.last_error: Optional[str] = None
+        self.latency_ms: Optional[float] = None
+
+    def mark_down(self, error: BaseException) -> None:
+        if self.healthy:
+            logger.warning("レプリカ %s を振り分けから外しました: %s", self.name, error)
+        self.healthy = False
+        self.last_error = type(error).__name__
+
+    async def check(self) -> bool:
+        """SELECT 1 で死活を確認し、結果を healthy に反映する"""
+        started = time.perf_counter()
+        session = self.session_factory()
+        try:
+            await asyncio.wait_for(session.execute(text("SELECT 1")), REPLICA_CHECK_TIMEOUT)
+        except Exception as e:
+            self.latency_ms = None
+            self.mark_down(e)
+            return False
+        finally:
+            await session.close()
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        if not self.healthy:
+            logger.info("レプリカ %s を振り分けに戻しました", self.name)
+        self.healthy = True
+        self.last_error = None
+        return True
+
+    def status(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "latency_ms": self.latency_ms,
+            "error": self.last_error,
+            "pool": engine_pool_status(self.engine),
+        }
+
+
+class ReplicaSet:
+    """レプリカの一覧と振り分け・死活確認"""
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(f"replica{i + 1}", url) for i, url in enumerate(urls)]
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def choose(self) -> Optional[Replica]:
+        """次に使うレプリカ（正常なものが無ければNone）"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(replica.check() for replica in self.replicas))
+
+    async def _check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(REPLICA_CHECK_INTERVAL)
+            try:
+                await self.check_all()
+            except Exception:
+                logger.exception("レプリカの死活確認に失敗しました")
+
+    async def start(self) -> None:
+        """起動時に一度確認し、定期的な確認を始める"""
+        if not self.replicas:
+            return
+        await self.check_all()
+        self._task = asyncio.create_task(self._check_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            result = replica.engine.dispose()
+            if inspect.isawaitable(result):
+                await result
+
+    def status(self) -> dict:
+        return {replica.name: replica.status() for replica in self.replicas}
+
+
+replicas = ReplicaSet(REPLICA_URLS)
+
+
+def _sticky_to_primary(request: Request) -> bool:
+    """直前に書き込んだクライアントか（Cookieの期限内か）"""
+    value = request.cookies.get(STICKY_COOKIE)
+    if not value:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
+
+
+# FastAPI依存注入用（読み込み専用のAPI。レプリカが無い・使えない場合はプライマリ）
+async def get_async_read_db(request: Request):
+    replica = None if _sticky_to_primary(request) else replicas.choose()
+    if replica is None:
+        async for db in get_async_db():
+            yield db
+        return
+
+    db = replica.session_factory()
+    try:
+        yield db
+    except DBAPIError as e:
+        # 接続が切れた場合は次の死活確認まで振り分けから外す（このリクエストはエラーのまま返す）
+        if e.connection_invalidated or isinstance(e.orig, (ConnectionError, OSError)):
+            replica.mark_down(e)
+        raise
+    finally:
+        await db.close()
+
+
+class ReadYourWritesMiddleware:
+    """書き込みに成功したレスポンスに、しばらく読み込みをプライマリに送るための Cookie を付けるASGIミドルウェア"""
+
+    def __init__(self, app, sticky_seconds: float = REPLICA_STICKY_SECONDS, read_only_paths: Iterable[str] = ()):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+        # POSTでも書き込みをしないパス（まとめて取得など）
+        self.read_only_paths = frozenset(read_only_paths)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] in SAFE_METHODS or not replicas.replicas
+                or scope["path"] in self.read_only_paths):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                expires = time.time() + self.sticky_seconds
+                cookie = (f"{STICKY_COOKIE}={expires:.3f}; Max-Age={int(self.sticky_seconds) + 1}; "
+                          f"Path=/; HttpOnly; SameSite=Lax")
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"set-cookie", cookie.encode("latin-1"))]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -3,6 +3,12 @@
 実行コマンド python app/infrastructure/test_connection.py
 '''
 
+import os
+import sys
+
+# appディレクトリをPythonパスに追加（db.py が infrastructure パッケージを参照するため）
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
 from sqlalchemy import text
 from db import get_db  
 
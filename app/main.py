@@ -1,17 +1,94 @@
 # app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 import sys
 import os
 sys.path.append('/app')
 
 from app.api.book.book import router as book_router
 from app.api.user.user import router as user_router
-from app.api import auth
+from app.api import auth, health
+from core.auth import token_cache
+from core.login_admission import login_admission
+from core.password_hasher import password_hasher
+from core.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from domain.book_cache import book_cache
+from domain.book_stats import book_stats
+from domain.overdue_sweeper import overdue_sweeper
+from domain.user_cache import user_cache
+from infrastructure.db import dispose_engines, pool_status, warm_up_pool
+from infrastructure.query_stats import QueryStatsMiddleware
+from infrastructure.replicas import ReadYourWritesMiddleware, replicas
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 最初のリクエストが接続の確立を待たないよう、プールに接続を作っておく
+    await warm_up_pool()
+    # パスワードハッシュのワーカーを起動し、存在しないユーザー用のダミーのハッシュを作っておく
+    await password_hasher.warm_up()
+    # 読み取りレプリカの死活確認を始める（DATABASE_REPLICA_URLS が無ければ何もしない）
+    await replicas.start()
+    # 延滞の定期処理を始める（複数ワーカーではリーダーの1つだけが処理する）
+    await overdue_sweeper.start()
+    # 本の統計をDBと突き合わせる（起動直後と定期的に）
+    await book_stats.start()
+    yield
+    # 終了時にパスワードハッシュ用のワーカーと定期処理を停止し、DB接続を閉じる
+    password_hasher.shutdown()
+    await overdue_sweeper.stop()
+    await book_stats.stop()
+    await replicas.stop()
+    await dispose_engines()
+
+app = FastAPI(lifespan=lifespan)
+
+# 出力時に読むメトリクス（コネクションプール・パスワードハッシュ・キャッシュ）
+def _pool_metric(key):
+    return lambda: {(name,): values[key] for name, values in pool_status().items() if key in values}
+
+registry.register_callback("db_pool_size", "gauge", "Configured connection pool size", ("engine",), _pool_metric("size"))
+registry.register_callback("db_pool_checked_out", "gauge", "Connections currently checked out", ("engine",), _pool_metric("checkedout"))
+registry.register_callback("db_pool_checked_in", "gauge", "Idle connections in the pool", ("engine",), _pool_metric("checkedin"))
+registry.register_callback("db_pool_overflow", "gauge", "Connections opened beyond pool size", ("engine",), _pool_metric("overflow"))
+registry.register_callback("db_pool_saturation", "gauge", "Checked out connections / pool capacity", ("engine",), _pool_metric("saturation"))
+
+def _hasher_metric(*keys):
+    return lambda: {(key,) if len(keys) > 1 else (): password_hasher.stats()[key] for key in keys}
+
+registry.register_callback("password_hash_seconds_total", "counter", "Time spent hashing/verifying passwords", (), _hasher_metric("total_seconds"))
+registry.register_callback("password_hash_max_seconds", "gauge", "Slowest password hash operation", (), _hasher_metric("max_seconds"))
+registry.register_callback("password_hash_pending", "gauge", "Password hash operations queued or running", (), _hasher_metric("pending"))
+registry.register_callback("password_hash_operations_total", "counter", "Password hash operations by outcome", ("outcome",),
+                           _hasher_metric("submitted", "completed", "rejected", "errors"))
+
+def _cache_metric():
+    stats = book_cache.stats()
+    return {(key,): stats[key] for key in ("hits", "misses", "sets", "deletes", "evictions", "expirations") if key in stats}
+
+registry.register_callback("book_cache_events_total", "counter", "Book cache events", ("event",), _cache_metric)
+
+def _auth_cache_metric():
+    values = {}
+    for name, stats in (("token", token_cache.info()), ("user", user_cache.stats())):
+        values.update({(name, key): stats[key] for key in ("hits", "misses", "evictions", "expirations")})
+    return values
+
+registry.register_callback("auth_cache_events_total", "counter", "Token claim / current user cache events", ("cache", "event"), _auth_cache_metric)
+
+def _admission_metric():
+    stats = login_admission.stats()
+    return {("admitted",): stats["admitted"], **{(f"rejected_{scope}",): n for scope, n in stats["rejected"].items()}}
+
+registry.register_callback("login_admission_total", "counter", "Login/register attempts by admission outcome", ("outcome",), _admission_metric)
+
+# リクエストのメトリクスと、リクエストごとのSQLの集計（Server-Timing ヘッダー）
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+# 書き込んだクライアントの読み込みを、しばらくプライマリに送る（レプリカ使用時のみ）
+app.add_middleware(ReadYourWritesMiddleware, read_only_paths=["/api/books/batch-get"])
 
 # CORS設定
 app.add_middleware(
@@ -25,14 +102,21 @@ app.add_middleware(
 app.include_router(book_router, prefix="/api/books")
 app.include_router(user_router, prefix="/api/users")
 app.include_router(auth.router, prefix="/api/auth") 
+app.include_router(health.router)
 
 # 静的ファイルの設定
-app.mount("/static", StaticFiles(directory="/app/app/static"), name="static")
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 # favicon.icoのエンドポイント
 @app.get("/favicon.ico")
 async def favicon():
-    return FileResponse("/app/app/static/favicon.ico")
+    return FileResponse(os.path.join(STATIC_DIR, "favicon.ico"))
+
+# メトリクス（Prometheusのテキスト形式）
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
 
 @app.get("/")
 def root():
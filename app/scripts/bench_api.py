@@ -0,0 +1,313 @@
+# bench_api.py - 本のAPIのベンチマーク
+'''
+DBに指定した件数の本を用意し、一覧・取得・検索・貸出/返却・ログイン・/me（認証付き）のエンドポイントに
+並行してリクエストを送り、p50/p95/p99 とスループットをJSONで出力する。
+結果を --output でファイルに保存すれば、コミットごとに比較できる。
+
+- in-process（既定）: アプリをこのプロセス内で動かす（ASGIを直接呼ぶのでネットワークを含まない）
+  DBは --database-url で指定（既定は一時ディレクトリのSQLiteファイル。使い捨てのPostgreSQLも可）
+- http: --base-url で起動済みのサーバーに送る（本の用意は /api/books/bulk で行う）
+
+実行コマンド python app/scripts/bench_api.py --books 10000 --concurrency 20 --seconds 10
+            python app/scripts/bench_api.py --database-url postgresql://appuser:pw@localhost:5433/bench --reset
+            python app/scripts/bench_api.py --base-url http://localhost:8000 --scenarios list,get,search
+'''
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+# appディレクトリとリポジトリのルートをPythonパスに追加（app.main を読み込むため）
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(APP_DIR)
+sys.path.append(os.path.join(APP_DIR, '..'))
+
+import httpx
+
+SCENARIOS = ("list", "get", "search", "borrow_return", "login", "me")
+WORDS = ("python", "database", "network", "design", "history", "science", "novel", "cooking",
+         "travel", "music", "economics", "biology", "algorithm", "poetry", "garden", "language")
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+def percentile(values, ratio):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+def make_records(count: int, seed: int):
+    """ベンチマーク用の本（検索で当たるよう、タイトルと説明に決まった単語を含める）"""
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        words = rng.sample(WORDS, 3)
+        yield i, {
+            "title": f"{words[0].title()} {words[1]} {i}",
+            "author": f"Author {i % 500}",
+            "isbn": f"bench-{i:011d}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(40)),
+            "pages": rng.randint(50, 900),
+            "published_year": rng.randint(1950, 2025),
+        }
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+# =========================
+# DBの用意（in-process）
+# =========================
+def to_async_url(url: str) -> str:
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    return url
+
+def prepare_database(url: str, books: int, reset: bool, seed: int):
+    """テーブルを作り、本とログイン用のユーザーを用意する"""
+    from sqlalchemy import create_engine, func, select
+    from sqlalchemy.orm import sessionmaker
+    from core.database import Base
+    from domain.book import Book
+    from domain.book_import import BookImporter
+    from domain.book_search import create_search_indexes
+    from domain.loan import create_loan_table
+    from domain.user import User
+    from core.password_hasher import password_hasher
+
+    engine = create_engine(url)
+    if reset:
+        Base.metadata.drop_all(engine)
+    create_loan_table(engine)
+    Base.metadata.create_all(engine)
+    create_search_indexes(engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        existing = db.scalar(select(func.count(Book.id)))
+        if existing < books:
+            print(f"📥 本を{books - existing}件登録中...", file=sys.stderr)
+            records = ((line, record) for line, record in make_records(books, seed) if line > existing)
+            BookImporter(db).import_records(records)
+        if db.scalar(select(User.id).where(User.email == BENCH_EMAIL)) is None:
+            hashed = asyncio.run(password_hasher.hash(BENCH_PASSWORD))
+            db.add(User(email=BENCH_EMAIL, name="bench", hashed_password=hashed))
+            db.commit()
+        book_ids = list(db.scalars(select(Book.id).order_by(Book.id).limit(books)))
+    return engine, book_ids
+
+def build_in_process_app(url: str, sync_engine):
+    """アプリを読み込み、DBをベンチマーク用のものに差し替える"""
+    from contextlib import asynccontextmanager
+    from sqlalchemy.orm import sessionmaker
+    import infrastructure.db as db_module
+    from infrastructure.replicas import get_async_read_db
+    from infrastructure.query_stats import install_query_hooks
+    # 全てのリクエストが同じクライアントから来るので、ログインの試行回数の制限は実質的に外す
+    for name in ("LOGIN_IP_BURST", "LOGIN_IP_PER_MINUTE", "LOGIN_ACCOUNT_BURST", "LOGIN_ACCOUNT_PER_MINUTE"):
+        os.environ.setdefault(name, "1000000000")
+    from app.main import app
+    import app.api.book.book as book_routes
+
+    try:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        async_engine = create_async_engine(to_async_url(url))
+        install_query_hooks(async_engine.sync_engine)
+        SessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def get_async_db():
+            async with SessionLocal() as db:
+                yield db
+    except ImportError:
+        # 非同期ドライバが無い場合は同期セッションをスレッドで使う
+        install_query_hooks(sync_engine)
+        SyncSession = sessionmaker(bind=sync_engine, autoflush=False, expire_on_commit=False)
+
+        async def get_async_db():
+            db = db_module.SyncSessionAdapter(SyncSession())
+            try:
+                yield db
+            finally:
+                await db.close()
+
+    app.dependency_overrides[db_module.get_async_db] = get_async_db
+    app.dependency_overrides[get_async_read_db] = get_async_db
+    book_routes.async_session_scope = asynccontextmanager(get_async_db)
+    book_routes.SessionLocal = sessionmaker(bind=sync_engine)
+    return app
+
+# =========================
+# シナリオ
+# =========================
+class Scenario:
+    """各メソッドは (ラベル, レスポンス, 秒) のリストを返す"""
+
+    def __init__(self, client: httpx.AsyncClient, book_ids, rng: random.Random, token: str = None):
+        self.client = client
+        self.book_ids = book_ids
+        self.rng = rng
+        self.token = token
+
+    @staticmethod
+    async def timed(label: str, request):
+        started = time.perf_counter()
+        response = await request
+        return label, response, time.perf_counter() - started
+
+    async def list(self):
+        return [await self.timed("list", self.client.get("/api/books/", params={"limit": 50}))]
+
+    async def get(self):
+        return [await self.timed("get", self.client.get(f"/api/books/{self.rng.choice(self.book_ids)}"))]
+
+    async def search(self):
+        return [await self.timed("search", self.client.get("/api/books/search", params={"q": self.rng.choice(WORDS)}))]
+
+    async def borrow_return(self):
+        book_id = self.rng.choice(self.book_ids)
+        return [
+            await self.timed("borrow", self.client.post(f"/api/books/{book_id}/borrow")),
+            await self.timed("return", self.client.post(f"/api/books/{book_id}/return")),
+        ]
+
+    async def login(self):
+        body = {"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+        return [await self.timed("login", self.client.post("/api/auth/login", json=body))]
+
+    async def me(self):
+        headers = {"Authorization": f"Bearer {self.token}"}
+        return [await self.timed("me", self.client.get("/api/auth/me", headers=headers))]
+
+def new_bucket():
+    return {"latencies": [], "status": Counter(), "errors": Counter()}
+
+async def worker(scenario: Scenario, name: str, deadline: float, samples: dict):
+    action = getattr(scenario, name)
+    while time.perf_counter() < deadline:
+        try:
+            responses = await action()
+        except httpx.HTTPError as e:
+            samples[name]["errors"][type(e).__name__] += 1
+            continue
+        for label, response, seconds in responses:
+            bucket = samples.setdefault(label, new_bucket())
+            bucket["latencies"].append(seconds)
+            bucket["status"][str(response.status_code)] += 1
+
+async def run_scenario(client, name: str, book_ids, concurrency: int, seconds: float, seed: int, token: str = None):
+    samples = {name: new_bucket()}
+    started = time.perf_counter()
+    deadline = started + seconds
+    await asyncio.gather(*(
+        worker(Scenario(client, book_ids, random.Random(seed + i), token), name, deadline, samples)
+        for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for label, bucket in samples.items():
+        latencies = bucket["latencies"]
+        if not latencies and not bucket["errors"]:
+            continue
+        results[label] = {
+            "requests": len(latencies),
+            "throughput_rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+            "status": dict(bucket["status"]),
+            "errors": dict(bucket["errors"]),
+        }
+    return results
+
+async def seed_over_http(client: httpx.AsyncClient, books: int, seed: int):
+    """起動済みのサーバーに一括取り込みAPIで本を登録し、ベンチマーク用のユーザーを作る"""
+    body = "".join(json.dumps(record) + "\n" for _, record in make_records(books, seed))
+    response = await client.post("/api/books/bulk", params={"format": "ndjson"}, content=body.encode("utf-8"))
+    response.raise_for_status()
+    await client.post("/api/auth/register", json={"email": BENCH_EMAIL, "name": "bench", "password": BENCH_PASSWORD})
+
+    book_ids, cursor = [], None
+    while len(book_ids) < books:
+        params = {"limit": 500, "fields": "id", **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/api/books/", params=params)).json()
+        book_ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    return book_ids
+
+async def login_token(client: httpx.AsyncClient) -> str:
+    """認証付きのシナリオ（me）で使うトークン"""
+    response = await client.post("/api/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def run(args):
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"不明なシナリオ: {', '.join(sorted(unknown))}")
+
+    if args.base_url:
+        mode, database = "http", None
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=30,
+                                   limits=httpx.Limits(max_connections=args.concurrency))
+        book_ids = await seed_over_http(client, args.books, args.seed) if not args.skip_seed else []
+        if not book_ids:
+            page = (await client.get("/api/books/", params={"limit": 500, "fields": "id"})).json()
+            book_ids = [item["id"] for item in page["items"]]
+    else:
+        mode = "in-process"
+        database = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+        sync_engine, book_ids = await asyncio.to_thread(prepare_database, database, args.books, args.reset, args.seed)
+        app = build_in_process_app(database, sync_engine)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30)
+
+    results = {}
+    async with client:
+        token = await login_token(client) if "me" in scenarios else None
+        for name in scenarios:
+            print(f"🏃 {name}（並行数 {args.concurrency}、{args.seconds}秒）", file=sys.stderr)
+            results.update(await run_scenario(client, name, book_ids, args.concurrency, args.seconds, args.seed, token))
+
+    return {
+        "commit": git_commit(),
+        "mode": mode,
+        "database": database.split("@")[-1] if database else None,
+        "base_url": args.base_url,
+        "books": len(book_ids),
+        "concurrency": args.concurrency,
+        "seconds_per_scenario": args.seconds,
+        "results": results,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本のAPIのベンチマーク")
+    parser.add_argument("--books", type=int, default=10000, help="用意する本の件数")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10, help="シナリオごとの実行時間")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"カンマ区切り（{', '.join(SCENARIOS)}）")
+    parser.add_argument("--database-url", help="in-processで使うDB（既定は一時ディレクトリのSQLite）")
+    parser.add_argument("--reset", action="store_true", help="テーブルを作り直す（使い捨てのDBでのみ使うこと）")
+    parser.add_argument("--base-url", help="起動済みのサーバーに送る場合のURL")
+    parser.add_argument("--skip-seed", action="store_true", help="http の場合に本を登録しない")
+    parser.add_argument("--seed", type=int, default=42, help="乱数のシード（同じ値なら同じデータとリクエスト）")
+    parser.add_argument("--output", help="結果のJSONを保存するファイル")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
@@ -0,0 +1,97 @@
+# bench_auth.py - 認証付きリクエストのオーバーヘッドを比較
+'''
+トークンの検証と、/api/auth/me（トークンの検証 + ユーザーの取得）の1回あたりの時間を、
+キャッシュを使わない場合（毎回クリア）と使う場合で比較する（マイクロ秒）。
+
+- decode:  jose の jwt.decode（署名の検証）と、core.auth.decode_token のキャッシュヒット
+- me:      アプリをこのプロセス内で動かし、/api/auth/me を順番に呼ぶ
+           （DBは一時ディレクトリのSQLite。queries は1リクエストあたりのSQLの数）
+
+実行コマンド python app/scripts/bench_auth.py --repeat 2000
+'''
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# appディレクトリとリポジトリのルートをPythonパスに追加（app.main を読み込むため）
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(APP_DIR)
+sys.path.append(os.path.join(APP_DIR, '..'))
+
+# アプリを読み込む前にDBを一時ファイルのSQLiteにする
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_auth.db')}")
+
+import httpx
+from jose import jwt
+
+from core.auth import ALGORITHM, SECRET_KEY, create_access_token, decode_token, token_cache
+from domain.user_cache import user_cache
+
+BENCH_EMAIL = "bench-auth@example.com"
+
+def per_call_us(func, repeat: int) -> float:
+    func()  # ウォームアップ
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return round((time.perf_counter() - started) / repeat * 1_000_000, 2)
+
+def bench_decode(token: str, repeat: int) -> dict:
+    return {
+        "jwt_decode_us": per_call_us(lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]), repeat),
+        "cached_us": per_call_us(lambda: decode_token(token), repeat),
+    }
+
+def prepare_user():
+    from core.database import Base
+    from domain.user import User
+    from infrastructure.db import SessionLocal, engine
+
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        if db.query(User).filter(User.email == BENCH_EMAIL).first() is None:
+            db.add(User(email=BENCH_EMAIL, name="bench", hashed_password="x"))
+            db.commit()
+
+async def bench_me(token: str, repeat: int) -> dict:
+    from app.main import app
+
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, clear in (("uncached", True), ("cached", False)):
+            response = await client.get("/api/auth/me", headers=headers)
+            response.raise_for_status()
+            queries = 0
+            started = time.perf_counter()
+            for _ in range(repeat):
+                if clear:
+                    token_cache.clear()
+                    user_cache.backend.clear()
+                response = await client.get("/api/auth/me", headers=headers)
+                timing = response.headers.get("server-timing", "")
+                queries += int(timing.split('desc="')[1].split()[0]) if 'desc="' in timing else 0
+            elapsed = time.perf_counter() - started
+            results[name] = {
+                "per_request_us": round(elapsed / repeat * 1_000_000, 2),
+                "queries_per_request": round(queries / repeat, 2),
+            }
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="認証付きリクエストのオーバーヘッドを比較")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    prepare_user()
+    token = create_access_token({"sub": BENCH_EMAIL})
+    print(json.dumps({
+        "repeat": args.repeat,
+        "decode": bench_decode(token, args.repeat),
+        "me": asyncio.run(bench_me(token, args.repeat)),
+    }, ensure_ascii=False, indent=2))
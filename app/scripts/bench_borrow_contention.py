@@ -0,0 +1,85 @@
+# bench_borrow_contention.py - 貸出・返却の競合ベンチマーク
+'''
+1冊の本に対して多数のクライアントが同時に貸出・返却を繰り返し、
+二重貸出が起きないこと（成功した貸出と返却が交互になること）とスループットを確認する。
+
+実行コマンド python app/scripts/bench_borrow_contention.py --clients 50 --seconds 10
+'''
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+# appディレクトリをPythonパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from domain.book_service import AsyncBookService, BookConflictError
+from infrastructure.db import async_session_scope
+
+def percentile(values, ratio):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+async def client(book_id: int, deadline: float, stats: dict):
+    """期限まで貸出→返却を繰り返す"""
+    while time.perf_counter() < deadline:
+        for action in ("borrow", "return"):
+            started = time.perf_counter()
+            try:
+                async with async_session_scope() as db:
+                    service = AsyncBookService(db)
+                    if action == "borrow":
+                        await service.borrow_book(book_id)
+                    else:
+                        await service.return_book(book_id)
+                stats[action] += 1
+            except BookConflictError:
+                stats["conflict"] += 1
+            except Exception:
+                stats["error"] += 1
+            stats["latencies"].append(time.perf_counter() - started)
+
+async def run(clients: int, seconds: float):
+    async with async_session_scope() as db:
+        book = await AsyncBookService(db).create_book(title="contention benchmark", author="bench")
+        book_id = book.id
+
+    stats = {"borrow": 0, "return": 0, "conflict": 0, "error": 0, "latencies": []}
+    started = time.perf_counter()
+    deadline = started + seconds
+    await asyncio.gather(*(client(book_id, deadline, stats) for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    async with async_session_scope() as db:
+        service = AsyncBookService(db)
+        final = await service.get_book_by_id(book_id)
+        is_available = final.is_available
+        await service.delete_book(book_id)
+
+    latencies = stats.pop("latencies")
+    # 成功した貸出と返却は交互にしか起きないので、差は 0 か 1 になるはず
+    consistent = stats["borrow"] - stats["return"] == (0 if is_available else 1)
+    return {
+        "clients": clients,
+        "seconds": round(elapsed, 3),
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        **stats,
+        "consistent": consistent,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="1冊の本に対する貸出・返却の競合ベンチマーク")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.clients, args.seconds))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,99 @@
+# bench_serialization.py - 本の一覧レスポンスのシリアライズ速度を比較
+'''
+DBを使わずにBookを作り、一覧レスポンス1回分をJSONのバイト列にするまでの時間を
+以下の方法で比較する（1冊あたりのマイクロ秒）。
+
+- legacy:   ルートで辞書を組み立て、FastAPIのJSONResponseと同じ jsonable_encoder + json.dumps
+- pydantic: BookOut.model_validate で検証してから model_dump_json
+- fast:     schemas.page_to_dict + core.serialization.dumps（orjsonが無ければ pydantic_core.to_json）
+
+実行コマンド python app/scripts/bench_serialization.py --items 5000 --repeat 20
+'''
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# appディレクトリをPythonパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from api.book.schemas import BookOut, page_to_dict
+from core import serialization
+from domain.book import Book
+from domain.pagination import Page
+
+def make_books(count: int):
+    now = datetime.now()
+    return [
+        Book(
+            id=i, title=f"本のタイトル {i}", author=f"著者 {i % 100}", isbn=f"978{i:010d}",
+            description="説明文 " * 20, pages=100 + i % 500, published_year=1950 + i % 70,
+            is_available=i % 3 != 0, borrowed_until=None if i % 3 else now + timedelta(days=7),
+            created_at=now, updated_at=now,
+        )
+        for i in range(1, count + 1)
+    ]
+
+def legacy(page):
+    books_data = []
+    for book in page.items:
+        books_data.append({
+            "id": book.id,
+            "title": book.title,
+            "author": book.author,
+            "isbn": book.isbn,
+            "description": book.description,
+            "pages": book.pages,
+            "published_year": book.published_year,
+            "is_available": book.is_available,
+            "borrowed_until": book.borrowed_until.isoformat() if book.borrowed_until else None,
+            "created_at": book.created_at.isoformat() if book.created_at else None,
+            "updated_at": book.updated_at.isoformat() if book.updated_at else None,
+        })
+    content = jsonable_encoder({"items": books_data, "next_cursor": page.next_cursor})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+_book_list = TypeAdapter(list[BookOut])
+
+def validated(page):
+    items = [BookOut.model_validate(book) for book in page.items]
+    return b'{"items":' + _book_list.dump_json(items) + b',"next_cursor":' + json.dumps(page.next_cursor).encode() + b"}"
+
+def fast(page):
+    return serialization.dumps(page_to_dict(page))
+
+def measure(func, page, repeat: int) -> float:
+    func(page)  # ウォームアップ
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(page)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本の一覧レスポンスのシリアライズ速度を比較")
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    page = Page(items=make_books(args.items), next_cursor="bench")
+    results = {}
+    for name, func in (("legacy", legacy), ("pydantic", validated), ("fast", fast)):
+        seconds = measure(func, page, args.repeat)
+        results[name] = {
+            "total_ms": round(seconds * 1000, 2),
+            "per_item_us": round(seconds / args.items * 1_000_000, 2),
+            "bytes": len(func(page)),
+        }
+    results["fast"]["speedup_vs_legacy"] = round(results["legacy"]["total_ms"] / results["fast"]["total_ms"], 1)
+    print(json.dumps({
+        "items": args.items,
+        "encoder": "orjson" if serialization.orjson is not None else "pydantic_core",
+        "results": results,
+    }, ensure_ascii=False, indent=2))
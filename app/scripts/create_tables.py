@@ -8,12 +8,16 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from core.database import Base
 from domain.book import Book  # モデルをインポートしてBaseに登録
 from domain.user import User
+from domain.loan import Loan, create_loan_table
+from domain.book_search import create_search_indexes
 from infrastructure.db import engine
 
 def create_tables():
     """すべてのテーブルを作成"""
     print("🔨 テーブルを作成中...")
+    create_loan_table(engine)  # 貸出履歴のパーティション化したテーブル（PostgreSQLのみ。create_all より前に作る）
     Base.metadata.create_all(bind=engine)
+    create_search_indexes(engine)  # 全文検索用のインデックス（PostgreSQLのみ）
     print("✅ テーブル作成完了！")
     
     # 作成されたテーブル一覧を表示
@@ -0,0 +1,44 @@
+# import_books.py - 本の一括取り込みスクリプト
+'''
+実行コマンド python app/scripts/import_books.py books.csv
+            python app/scripts/import_books.py books.ndjson --batch-size 10000
+'''
+import argparse
+import os
+import sys
+import time
+
+# appディレクトリをPythonパスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from domain.book_import import IMPORT_BATCH_SIZE, IMPORT_FORMATS
+from domain.book_service import BookService
+from infrastructure.db import SessionLocal
+
+def import_file(path: str, fmt: str, batch_size: int):
+    """CSV / NDJSON ファイルから本を一括取り込み"""
+    print(f"📥 {path} を取り込み中...（形式: {fmt}, バッチ: {batch_size}件）")
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        with open(path, encoding="utf-8", newline="") as source:
+            report = BookService(db).import_books(source, fmt, batch_size)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"✅ 取り込み完了！ {report.loaded}/{report.received}件（{elapsed:.1f}秒）")
+    if report.failed:
+        print(f"❌ 取り込めなかった行: {report.failed}件")
+        for error in report.errors:
+            print(f"  - {error.line}行目: {error.error}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本をCSV / NDJSONから一括取り込み")
+    parser.add_argument("path", help="取り込むファイル")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="省略時は拡張子から判定")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    import_file(args.path, fmt, args.batch_size)
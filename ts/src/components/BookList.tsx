@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import type { Book } from '../types/Book';
-import { bookAPI } from '../services/api';
+import { applyBookEvent, bookAPI, subscribeBookEvents } from '../services/api';
 import BookCard from './BookCard';
 import './BookList.css';
 
@@ -90,6 +90,17 @@ const BookList: React.FC<BookListProps> = ({ onEditBook, refreshTrigger }) => {
     fetchBooks();
   }, [refreshTrigger]);
 
+  // 他の利用者の貸出・返却などを変更フィードで反映する（一覧全体は取り直さない）
+  useEffect(() => {
+    return subscribeBookEvents((event) => {
+      if (event.type === 'reset') {
+        fetchBooks();
+        return;
+      }
+      setBooks(prev => applyBookEvent(prev, event));
+    });
+  }, []);
+
   if (loading) {
     return <div className="loading">読み込み中...</div>;
   }
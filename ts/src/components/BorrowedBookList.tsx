@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import type { Book } from '../types/Book';
-import { bookAPI } from '../services/api';
+import { applyBookEvent, bookAPI, subscribeBookEvents } from '../services/api';
 import BookCard from './BookCard';
 import './BorrowedBookList.css';
 
@@ -54,6 +54,23 @@ const BorrowedBookList: React.FC = () => {
     fetchBorrowedBooks();
   }, []);
 
+  // 貸出・返却を変更フィードで反映する（一覧全体は取り直さない）
+  useEffect(() => {
+    return subscribeBookEvents(async (event) => {
+      if (event.type === 'reset') {
+        fetchBorrowedBooks();
+      } else if (event.type === 'returned' || event.type === 'deleted') {
+        setBorrowedBooks(prev => prev.filter(book => book.id !== event.id));
+      } else if (event.type === 'borrowed' && event.id !== undefined) {
+        // イベントには貸出の列しか無いので、新しく貸し出された本だけ取得する
+        const book = await bookAPI.getBook(event.id);
+        setBorrowedBooks(prev => prev.some(b => b.id === book.id) ? prev : [...prev, book]);
+      } else {
+        setBorrowedBooks(prev => applyBookEvent(prev, event));
+      }
+    });
+  }, []);
+
   if (loading) {
     return <div className="loading">貸出中の本を読み込み中...</div>;
   }
@@ -1,20 +1,25 @@
 import axios from 'axios';
-import type { Book, CreateBookRequest, UpdateBookRequest } from '../types/Book';
+import type { Book, BookEvent, BookPage, CreateBookRequest, UpdateBookRequest } from '../types/Book';
 
 const API_BASE_URL = 'http://localhost:8000';
 
+// 一覧のカードに表示する列（一覧APIは fields を省略すると最小限の列しか返さない）
+const BOOK_CARD_FIELDS = 'id,title,author,isbn,description,pages,published_year,is_available,borrowed_until,created_at';
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   headers: {
     'Content-Type': 'application/json',
   },
+  // 書き込み直後の読み込みをプライマリDBに送るための Cookie を送受信する
+  withCredentials: true,
 });
 
 export const bookAPI = {
   // 全ての本を取得
   getBooks: async (): Promise<Book[]> => {
-    const response = await api.get('/api/books/');
-    return response.data;
+    const response = await api.get<BookPage>('/api/books/', { params: { fields: BOOK_CARD_FIELDS } });
+    return response.data.items;
   },
 
   // IDで本を取得
@@ -42,8 +47,8 @@ export const bookAPI = {
 
   // 本を検索
   searchBooks: async (query: string): Promise<Book[]> => {
-    const response = await api.get(`/api/books/search?q=${encodeURIComponent(query)}`);
-    return response.data;
+    const response = await api.get<BookPage>(`/api/books/search?q=${encodeURIComponent(query)}`);
+    return response.data.items;
   },
 
   // 本を貸し出し（1週間）
@@ -60,7 +65,39 @@ export const bookAPI = {
 
   // 貸出中の本一覧を取得
   getBorrowedBooks: async (): Promise<Book[]> => {
-    const response = await api.get('/api/books/borrowed');
-    return response.data;
+    const response = await api.get<BookPage>('/api/books/borrowed', { params: { fields: BOOK_CARD_FIELDS } });
+    return response.data.items;
   },
-};
\ No newline at end of file
+};
+
+const BOOK_EVENT_TYPES = ['created', 'updated', 'deleted', 'borrowed', 'returned', 'overdue', 'reset'] as const;
+
+// 本の変更フィードを購読する（戻り値の関数で購読をやめる）
+// EventSource は切断されると Last-Event-ID を付けて自動で再接続し、続きから受け取る
+export const subscribeBookEvents = (onEvent: (event: BookEvent) => void): (() => void) => {
+  const source = new EventSource(`${API_BASE_URL}/api/books/events`, { withCredentials: true });
+  BOOK_EVENT_TYPES.forEach(type => {
+    source.addEventListener(type, (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      onEvent({ ...data, type });
+    });
+  });
+  return () => source.close();
+};
+
+// イベントを一覧に反映する（reset は呼び出し側で一覧を取り直す）
+export const applyBookEvent = (books: Book[], event: BookEvent): Book[] => {
+  switch (event.type) {
+    case 'created':
+      return books.some(book => book.id === event.id) ? books : [...books, event.changes as Book];
+    case 'deleted':
+      return books.filter(book => book.id !== event.id);
+    case 'updated':
+    case 'borrowed':
+    case 'returned':
+    case 'overdue':
+      return books.map(book => (book.id === event.id ? { ...book, ...event.changes } : book));
+    default:
+      return books;
+  }
+};
@@ -12,6 +12,20 @@ export interface Book {
   updated_at?: string;
 }
 
+// 一覧APIのレスポンス（キーセット方式のページング）
+export interface BookPage {
+  items: Book[];
+  next_cursor: string | null;
+}
+
+// 変更フィードのイベント（changes には変わった列だけが入る）
+export interface BookEvent {
+  seq: number;
+  type: 'created' | 'updated' | 'deleted' | 'borrowed' | 'returned' | 'overdue' | 'reset';
+  id?: number;
+  changes?: Partial<Book>;
+}
+
 export interface CreateBookRequest {
   title: string;
   author: string;